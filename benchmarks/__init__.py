@@ -0,0 +1,6 @@
+"""Headless benchmarks for the database layer.
+
+Run with ``python -m benchmarks``; see benchmarks/__main__.py for the options. The suite
+builds a synthetic database in a temporary directory (datagen.py), times Database methods
+against it (cases.py, runner.py) and writes JSON results that can be diffed across commits.
+"""
@@ -0,0 +1,61 @@
+"""Command-line entry point for the database benchmarks.
+
+Usage:
+    python -m benchmarks [--users N] [--workouts N] [--teams N] [--iterations N]
+                         [--profile balanced] [--case NAME ...] [--output results.json]
+                         [--compare baseline.json] [--keep DIR]
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+from data import STORAGE_PROFILES, ConnectionManager
+
+from . import datagen, runner
+from .cases import CASES
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Time the database layer")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--workouts", type=int, default=100_000)
+    parser.add_argument("--teams", type=int, default=50)
+    parser.add_argument("--days", type=int, default=365, help="spread workouts over this many days")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=1000, help="timed calls per case (scaled per case)")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--profile", choices=STORAGE_PROFILES, default="balanced")
+    parser.add_argument("--case", action="append", choices=CASES, dest="cases", help="run only these cases")
+    parser.add_argument("--output", default="benchmark_results.json", help="where to save the JSON results")
+    parser.add_argument("--compare", help="a previous results file to diff against")
+    parser.add_argument("--keep", help="build the database in this directory and keep it")
+    args = parser.parse_args(argv)
+
+    workdir = args.keep or tempfile.mkdtemp(prefix="fitness-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    manager = ConnectionManager(os.path.join(workdir, "bench.db"), args.profile)
+    try:
+        with manager.database() as db:
+            print(f"Generating {args.users} users, {args.teams} teams, {args.workouts} workouts in {workdir}")
+            dataset = datagen.generate(
+                db, users=args.users, workouts=args.workouts, teams=args.teams, days=args.days, seed=args.seed,
+                progress=lambda done, total: print(f"  {done}/{total} workouts", end="\r", file=sys.stderr))
+            print(f"Generated in {dataset['seconds']}s")
+            results = runner.run_cases(db, dataset, args.cases, args.iterations, args.warmup, args.seed)
+        settings = {"profile": args.profile, "iterations": args.iterations, "warmup": args.warmup}
+        runner.write_results(args.output, results, dataset, settings)
+        print(f"Results written to {args.output}")
+        if args.compare:
+            runner.compare(args.compare, results)
+    finally:
+        manager.close()
+        if not args.keep:
+            for name in os.listdir(workdir):
+                os.remove(os.path.join(workdir, name))
+            os.rmdir(workdir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
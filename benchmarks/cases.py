@@ -0,0 +1,144 @@
+"""The Database calls being timed.
+
+Each case is a function case(db, rng, data) doing one operation against the generated
+dataset (`data` is the summary returned by datagen.generate). Writes that would change
+the dataset for later cases undo themselves, and undo time is included in the sample.
+"""
+from datetime import date, datetime, timedelta
+
+from . import datagen
+
+
+def _any_user(rng, data):
+    return datagen.username(rng.randrange(data["users"]))
+
+
+def _any_team(rng, data):
+    return datagen.team_name(rng.randrange(data["teams"]))
+
+
+def _delete_workouts_after(db, last_id):
+    """Undoes inserts: deletes workouts with ids above `last_id` (the triggers undo the totals)."""
+    with db.conn:
+        db.cursor.execute("DELETE FROM workouts WHERE id > ?", (last_id,))
+
+
+def _last_workout_id(db):
+    db.cursor.execute("SELECT COALESCE(MAX(id), 0) FROM workouts")
+    return db.cursor.fetchone()[0]
+
+
+def add_workout(db, rng, data):
+    last_id = _last_workout_id(db)
+    db.add_workout(_any_user(rng, data), rng.choice(datagen.WORKOUT_TYPES), 30, 250)
+    _delete_workouts_after(db, last_id)
+
+
+def add_workouts_bulk_100(db, rng, data):
+    user = _any_user(rng, data)
+    last_id = _last_workout_id(db)
+    now = datetime.now()
+    # A second apart, so the content-derived dedupe keys are distinct and all 100 rows go in.
+    db.add_workouts_bulk(user, ({"workout_type": "Running", "duration": 30, "calories": 250,
+                                 "date": now - timedelta(seconds=offset)} for offset in range(100)))
+    _delete_workouts_after(db, last_id)
+
+
+def get_workout_summary(db, rng, data):
+    db.get_workout_summary(_any_user(rng, data))
+
+
+def get_workout_history(db, rng, data):
+    db.get_workout_history(_any_user(rng, data))
+
+
+def get_workout_history_page(db, rng, data):
+    rows, cursor = db.get_workout_history_page(_any_user(rng, data), limit=30)
+    if cursor:
+        db.get_workout_history_page(_any_user(rng, data), before=cursor, limit=30)
+
+
+def get_workout_stats_week(db, rng, data):
+    db.get_workout_stats(_any_user(rng, data), start=date.today() - timedelta(days=90), bucket="week")
+
+
+def get_user_info(db, rng, data):
+    db.get_user_info(_any_user(rng, data))
+
+
+def update_measurements(db, rng, data):
+    user = _any_user(rng, data)
+    db.cursor.execute("""
+        SELECT b.weight, b.height, b.body_fat FROM body_measurements b
+        JOIN users u ON u.id = b.user_id WHERE u.username = ?""", (user,))
+    previous = db.cursor.fetchone()
+    db.update_measurements(user, rng.uniform(50, 110), rng.uniform(150, 200), rng.uniform(8, 35))
+    # Put the measurements back so the dataset stays as generated.
+    if previous:
+        db.update_measurements(user, *previous)
+    else:
+        with db.conn:
+            db.cursor.execute("DELETE FROM body_measurements WHERE user_id = (SELECT id FROM users WHERE username = ?)",
+                              (user,))
+
+
+def validate_user(db, rng, data):
+    db.validate_user(_any_user(rng, data), datagen.PASSWORD)
+
+
+def get_teams(db, rng, data):
+    db.get_teams()
+
+
+def get_user_team(db, rng, data):
+    db.get_user_team(_any_user(rng, data))
+
+
+def get_team_members(db, rng, data):
+    db.get_team_members(_any_team(rng, data))
+
+
+def join_and_leave_team(db, rng, data):
+    user = _any_user(rng, data)
+    team = db.get_user_team(user)
+    db.join_team(_any_team(rng, data), user) if team is None else db.leave_team(user)
+    # Put the membership back so the dataset stays as generated.
+    db.leave_team(user) if team is None else db.join_team(team, user)
+
+
+def get_team_leaderboard(db, rng, data):
+    db.get_team_leaderboard("calories")
+
+
+def get_team_leaderboard_7d(db, rng, data):
+    db.get_team_leaderboard("minutes", days=7)
+
+
+def get_team_leaderboard_90d(db, rng, data):
+    db.get_team_leaderboard("workouts", days=90)
+
+
+def get_team_member_leaderboard_30d(db, rng, data):
+    db.get_team_member_leaderboard(_any_team(rng, data), "calories", days=30)
+
+
+# name -> (case, iterations relative to --iterations). Hashing cases are deliberately slow.
+CASES = {
+    "add_workout": (add_workout, 1.0),
+    "add_workouts_bulk_100": (add_workouts_bulk_100, 0.1),
+    "get_workout_summary": (get_workout_summary, 1.0),
+    "get_workout_history": (get_workout_history, 1.0),
+    "get_workout_history_page": (get_workout_history_page, 1.0),
+    "get_workout_stats_week": (get_workout_stats_week, 1.0),
+    "get_user_info": (get_user_info, 1.0),
+    "update_measurements": (update_measurements, 1.0),
+    "validate_user": (validate_user, 0.02),
+    "get_teams": (get_teams, 0.2),
+    "get_user_team": (get_user_team, 1.0),
+    "get_team_members": (get_team_members, 1.0),
+    "join_and_leave_team": (join_and_leave_team, 0.5),
+    "get_team_leaderboard": (get_team_leaderboard, 1.0),
+    "get_team_leaderboard_7d": (get_team_leaderboard_7d, 1.0),
+    "get_team_leaderboard_90d": (get_team_leaderboard_90d, 0.2),
+    "get_team_member_leaderboard_30d": (get_team_member_leaderboard_30d, 0.5),
+}
@@ -0,0 +1,83 @@
+"""Synthetic users, teams, memberships and workouts for benchmarking.
+
+Data is deterministic for a given seed so runs on different commits measure the same
+database. Workouts go through Database.add_workouts_bulk in chunks, which keeps memory
+flat for tens of millions of rows and exercises the same triggers the app relies on.
+"""
+import random
+import time
+from datetime import datetime, timedelta
+
+from data import passwords
+
+WORKOUT_TYPES = ("Running", "Cycling", "Swimming", "Strength", "Yoga", "Walking", "HIIT", "Rowing")
+PASSWORD = "benchmark-password"  # Every synthetic user shares it so validate_user can be timed
+
+
+def username(index):
+    return f"user{index:07d}"
+
+
+def team_name(index):
+    return f"team{index:05d}"
+
+
+def generate(db, users=1000, workouts=100_000, teams=50, membership=0.8, days=365, seed=0,
+             chunk_size=50_000, progress=None):
+    """Fills an empty database and returns a summary of what was generated.
+
+    `membership` is the fraction of users placed in a team (one team each, as in the
+    app); workouts are spread uniformly over the last `days` days. `progress(done, total)`
+    is called after each workout chunk.
+    """
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    # Hash once: per-user hashing at the production cost would dominate generation time.
+    password_hash = passwords.hash_password(PASSWORD)
+    join_date = datetime.now().strftime("%Y-%m-%d")
+
+    db.cursor.execute("BEGIN IMMEDIATE")
+    db.cursor.executemany(
+        "INSERT INTO users (username, email, password, join_date) VALUES (?, ?, ?, ?)",
+        ((username(i), f"{username(i)}@example.com", password_hash, join_date) for i in range(users)))
+    db.cursor.execute("COMMIT")
+
+    team_count = min(teams, users)
+    for index in range(team_count):
+        db.add_team(team_name(index), username(index))  # Creators join their own team
+    members = team_count
+    for index in range(team_count, users):
+        if team_count and rng.random() < membership:
+            db.join_team(team_name(rng.randrange(team_count)), username(index))
+            members += 1
+
+    now = datetime.now()
+    span = days * 24 * 60 * 60
+
+    def rows(count):
+        for _ in range(count):
+            yield {
+                "username": username(rng.randrange(users)),
+                "workout_type": rng.choice(WORKOUT_TYPES),
+                "duration": rng.randint(10, 120),
+                "calories": rng.randint(50, 1200),
+                "date": now - timedelta(seconds=rng.randrange(span)),
+            }
+
+    done = 0
+    while done < workouts:
+        count = min(chunk_size, workouts - done)
+        db.add_workouts_bulk(None, rows(count))
+        done += count
+        if progress:
+            progress(done, workouts)
+
+    return {
+        "users": users,
+        "teams": team_count,
+        "members": members,
+        "workouts": workouts,
+        "days": days,
+        "seed": seed,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
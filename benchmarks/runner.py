@@ -0,0 +1,107 @@
+"""Times benchmark cases and records the results as JSON."""
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from .cases import CASES
+
+
+def percentile(sorted_samples, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_samples:
+        return 0.0
+    index = max(0, min(len(sorted_samples) - 1, round(fraction * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+
+def summarize(samples):
+    """Latency percentiles in milliseconds plus throughput for a list of durations in seconds."""
+    ordered = sorted(samples)
+    total = sum(ordered)
+    return {
+        "iterations": len(ordered),
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 4),
+        "mean_ms": round(total / len(ordered) * 1000, 4) if ordered else 0.0,
+        "ops_per_sec": round(len(ordered) / total, 1) if total else 0.0,
+    }
+
+
+def time_case(db, case, data, iterations, warmup, seed):
+    """Runs `case` `warmup` times untimed, then returns `iterations` durations in seconds."""
+    rng = random.Random(seed)
+    for _ in range(warmup):
+        case(db, rng, data)
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        case(db, rng, data)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def run_cases(db, data, names=None, iterations=1000, warmup=20, seed=0, report=print):
+    """Times each named case (all by default) and returns {name: summary}."""
+    results = {}
+    for name in names or CASES:
+        case, scale = CASES[name]
+        count = max(1, int(iterations * scale))
+        samples = time_case(db, case, data, count, min(warmup, count), seed)
+        results[name] = summarize(samples)
+        report(format_result(name, results[name]))
+    return results
+
+
+def format_result(name, result):
+    return (f"{name:<34} p50 {result['p50_ms']:>9.3f} ms  p95 {result['p95_ms']:>9.3f} ms  "
+            f"p99 {result['p99_ms']:>9.3f} ms  {result['ops_per_sec']:>10.1f} ops/s")
+
+
+def git_commit():
+    """The current commit hash, or None outside a git checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+    }
+
+
+def write_results(path, results, dataset, settings):
+    """Saves a run as JSON: environment, dataset summary, settings and per-case results."""
+    document = {"environment": environment(), "dataset": dataset, "settings": settings, "results": results}
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(document, handle, indent=2)
+        handle.write("\n")
+    return document
+
+
+def compare(baseline_path, results, report=print):
+    """Prints each case's p50/p95 change against a previously saved run."""
+    with open(baseline_path, encoding="utf-8") as handle:
+        baseline = json.load(handle)["results"]
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        changes = []
+        for key in ("p50_ms", "p95_ms"):
+            delta = (result[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            changes.append(f"{key[:3]} {before[key]:.3f} -> {result[key]:.3f} ms ({delta:+.1f}%)")
+        report(f"{name:<34} " + "  ".join(changes))
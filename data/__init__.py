@@ -0,0 +1,9 @@
+"""Pure data-access layer: SQLite schema, queries, change events, password hashing and bulk import/export.
+
+Nothing in this package imports Kivy, so scripts, workers and benchmarks can use it
+without the GUI. The Kivy side (background workers, running-app lookups) lives in
+db_worker.py.
+"""
+from .database import DB_PATH, STORAGE_PROFILES, ConnectionManager, Database
+
+__all__ = ["DB_PATH", "STORAGE_PROFILES", "ConnectionManager", "Database"]
@@ -0,0 +1,1544 @@
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from . import passwords
+from .events import (EventBus, MeasurementsUpdated, TeamDeleted, TeamJoined, TeamLeft, WorkoutAdded,
+                     WorkoutsImported, WorkoutsReset)
+from .importer import dedupe_key
+from .query_trace import env_tracer
+
+DB_PATH = "users.db"
+SETTINGS_PATH = "settings.json"
+
+# Named connection tunings. All use WAL so readers never block the writer (or each other);
+# they differ in how much durability they trade for speed:
+#   durable    - fsync on every commit, small cache; nothing committed is ever lost.
+#   balanced   - fsync at checkpoints only; a power cut may drop the last commits, never corrupts.
+#   throughput - no fsyncs and large caches, for bulk imports and benchmarks on disposable data.
+# cache_size is in KiB when negative, mmap_size in bytes, busy_timeout in milliseconds.
+STORAGE_PROFILES = {
+    "durable": {
+        "journal_mode": "WAL", "synchronous": "FULL", "mmap_size": 0,
+        "cache_size": -2000, "temp_store": "DEFAULT", "busy_timeout": 5000,
+    },
+    "balanced": {
+        "journal_mode": "WAL", "synchronous": "NORMAL", "mmap_size": 64 * 1024 * 1024,
+        "cache_size": -16000, "temp_store": "MEMORY", "busy_timeout": 5000,
+    },
+    "throughput": {
+        "journal_mode": "WAL", "synchronous": "OFF", "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64000, "temp_store": "MEMORY", "busy_timeout": 10000,
+    },
+}
+DEFAULT_STORAGE_PROFILE = "balanced"
+STORAGE_PROFILE_ENV = "FITNESS_DB_PROFILE"  # Overrides the profile saved in settings.json
+
+# SQL expressions mapping a workout timestamp to the start of its rollup period.
+# Weeks start on Monday; all periods are stored as YYYY-MM-DD text.
+ROLLUP_BUCKETS = {
+    "day": "date({0})",
+    "week": "date({0}, '-6 days', 'weekday 1')",
+    "month": "strftime('%Y-%m-01', {0})",
+}
+
+
+def _rollup_periods(column):
+    """SELECT yielding one (bucket, period_start) row per rollup bucket for `column`."""
+    return " UNION ALL ".join(
+        f"SELECT '{bucket}' AS bucket, {expression.format(column)} AS period_start"
+        for bucket, expression in ROLLUP_BUCKETS.items()
+    )
+
+
+def _rollup_backfill():
+    """SELECT aggregating the whole workouts table into workout_rollups rows."""
+    return " UNION ALL ".join(
+        f"SELECT username, '{bucket}', {expression.format('date')}, workout_type, COUNT(*), SUM(duration), SUM(calories) "
+        f"FROM workouts GROUP BY username, 3, workout_type"
+        for bucket, expression in ROLLUP_BUCKETS.items()
+    )
+
+
+LEADERBOARD_METRICS = ("calories", "minutes", "workouts")
+
+# Rolling windows (in days) whose team rankings are kept materialized in team_window_totals.
+# Other window lengths are still answered, by aggregating team_daily_totals on demand.
+LEADERBOARD_WINDOWS = (7, 30)
+
+# SQL for the first day of a leaderboard_windows row's window.
+_WINDOW_START_SQL = "date(lw.as_of, '-' || (lw.window_days - 1) || ' days')"
+
+# Recompute team leaderboard tables from current memberships (used by migration 9 and rebuilds).
+_TEAM_LEADERBOARD_BACKFILL_DAILY = """
+    INSERT INTO team_daily_totals (team_id, day, workouts, minutes, calories)
+    SELECT m.team_id, r.period_start, SUM(r.workouts), SUM(r.duration), SUM(r.calories)
+    FROM team_members m
+    JOIN users u ON u.id = m.user_id
+    JOIN workout_rollups r ON r.username = u.username AND r.bucket = 'day'
+    GROUP BY m.team_id, r.period_start
+"""
+_TEAM_LEADERBOARD_BACKFILL_TOTALS = """
+    INSERT INTO team_totals (team_id, workouts, minutes, calories)
+    SELECT t.id, COALESCE(SUM(w.total_workouts), 0), COALESCE(SUM(w.total_time), 0), COALESCE(SUM(w.total_calories), 0)
+    FROM teams t
+    LEFT JOIN team_members m ON m.team_id = t.id
+    LEFT JOIN users u ON u.id = m.user_id
+    LEFT JOIN workout_totals w ON w.username = u.username
+    GROUP BY t.id
+"""
+_TEAM_LEADERBOARD_BACKFILL_WINDOWS = f"""
+    INSERT INTO team_window_totals (window_days, team_id, workouts, minutes, calories)
+    SELECT lw.window_days, d.team_id, SUM(d.workouts), SUM(d.minutes), SUM(d.calories)
+    FROM leaderboard_windows lw JOIN team_daily_totals d ON d.day >= {_WINDOW_START_SQL}
+    GROUP BY lw.window_days, d.team_id
+"""
+
+
+def _team_workout_add_sql():
+    """Trigger body adding NEW workout to the leaderboards of every team its user belongs to."""
+    return f"""
+            INSERT INTO team_daily_totals (team_id, day, workouts, minutes, calories)
+            SELECT m.team_id, date(NEW.date), 1, NEW.duration, NEW.calories
+            FROM team_members m
+            WHERE m.user_id = (SELECT id FROM users WHERE username = NEW.username)
+            ON CONFLICT (team_id, day) DO UPDATE SET
+                workouts = workouts + 1,
+                minutes = minutes + excluded.minutes,
+                calories = calories + excluded.calories;
+            INSERT INTO team_totals (team_id, workouts, minutes, calories)
+            SELECT m.team_id, 1, NEW.duration, NEW.calories
+            FROM team_members m
+            WHERE m.user_id = (SELECT id FROM users WHERE username = NEW.username)
+            ON CONFLICT (team_id) DO UPDATE SET
+                workouts = workouts + 1,
+                minutes = minutes + excluded.minutes,
+                calories = calories + excluded.calories;
+            INSERT INTO team_window_totals (window_days, team_id, workouts, minutes, calories)
+            SELECT lw.window_days, m.team_id, 1, NEW.duration, NEW.calories
+            FROM team_members m JOIN leaderboard_windows lw
+            WHERE m.user_id = (SELECT id FROM users WHERE username = NEW.username)
+              AND date(NEW.date) >= {_WINDOW_START_SQL}
+            ON CONFLICT (window_days, team_id) DO UPDATE SET
+                workouts = workouts + 1,
+                minutes = minutes + excluded.minutes,
+                calories = calories + excluded.calories;
+    """
+
+
+def _team_workout_remove_sql():
+    """Trigger body taking OLD workout off the leaderboards of its user's teams."""
+    return f"""
+            UPDATE team_daily_totals SET
+                workouts = workouts - 1,
+                minutes = minutes - OLD.duration,
+                calories = calories - OLD.calories
+            WHERE day = date(OLD.date) AND team_id IN (
+                SELECT team_id FROM team_members WHERE user_id = (SELECT id FROM users WHERE username = OLD.username));
+            UPDATE team_totals SET
+                workouts = workouts - 1,
+                minutes = minutes - OLD.duration,
+                calories = calories - OLD.calories
+            WHERE team_id IN (
+                SELECT team_id FROM team_members WHERE user_id = (SELECT id FROM users WHERE username = OLD.username));
+            UPDATE team_window_totals SET
+                workouts = workouts - 1,
+                minutes = minutes - OLD.duration,
+                calories = calories - OLD.calories
+            WHERE team_id IN (
+                SELECT team_id FROM team_members WHERE user_id = (SELECT id FROM users WHERE username = OLD.username))
+              AND window_days IN (
+                SELECT lw.window_days FROM leaderboard_windows lw WHERE date(OLD.date) >= {_WINDOW_START_SQL});
+    """
+
+def resolve_storage_profile(name=None):
+    """Picks the storage profile: `name`, then $FITNESS_DB_PROFILE, then settings.json, then the default.
+
+    An unknown name passed in or set in the environment is an error; an unknown value in
+    settings.json is reported and ignored, like SettingsService does.
+    """
+    name = name or os.environ.get(STORAGE_PROFILE_ENV)
+    if name:
+        if name not in STORAGE_PROFILES:
+            raise ValueError(f"Unknown storage profile '{name}', expected one of {tuple(STORAGE_PROFILES)}")
+        return name
+    try:
+        with open(SETTINGS_PATH, encoding="utf-8") as handle:
+            name = json.load(handle).get("settings", {}).get("storage_profile")
+    except (OSError, ValueError, AttributeError):
+        name = None
+    if name is not None and name not in STORAGE_PROFILES:
+        print(f"Ignoring invalid storage_profile={name!r} in {SETTINGS_PATH}", file=sys.stderr)
+        name = None
+    return name or DEFAULT_STORAGE_PROFILE
+
+
+def apply_storage_profile(conn, name):
+    """Applies a storage profile's pragmas to a fresh connection; returns the effective settings."""
+    for pragma, value in STORAGE_PROFILES[name].items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    # journal_mode can silently stay put (e.g. ":memory:" databases), so report what SQLite says.
+    return {pragma: conn.execute(f"PRAGMA {pragma}").fetchone()[0] for pragma in STORAGE_PROFILES[name]}
+
+
+def _migration_11_dedupe_key(username, workout_type, duration, calories, date):
+    """importer.dedupe_key as it was when migration 11 shipped; frozen so the migration never changes."""
+    fields = (username, date, workout_type, duration, calories)
+    return hashlib.blake2b("|".join(str(field) for field in fields).encode(), digest_size=16).hexdigest()
+
+
+def _backfill_dedupe_keys(cursor, batch_size=1000):
+    """Gives workouts stored without a dedupe key the key the importer derived for them at version 11."""
+    rows = cursor.connection.cursor()
+    try:
+        rows.execute("SELECT id, username, workout_type, duration, calories, date FROM workouts "
+                     "WHERE dedupe_key IS NULL ORDER BY id")
+        while True:
+            batch = rows.fetchmany(batch_size)
+            if not batch:
+                break
+            # OR IGNORE: of several identical rows only the first gets the key, the others stay NULL.
+            cursor.executemany("UPDATE OR IGNORE workouts SET dedupe_key = ? WHERE id = ?",
+                               ((_migration_11_dedupe_key(*row[1:]), row[0]) for row in batch))
+    finally:
+        rows.close()
+
+
+# Ordered schema migrations as (version, description, statements). Each step runs in its own
+# transaction and is recorded in `schema_version`; never edit a released step, append a new one.
+# Statements are SQL strings, or callables taking the cursor for steps SQL cannot express.
+MIGRATIONS = [
+    (1, "Create base tables", [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            join_date TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS body_measurements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            weight REAL DEFAULT 0,
+            height REAL DEFAULT 0,
+            body_fat REAL DEFAULT 0,
+            bmi REAL DEFAULT 0,
+            FOREIGN KEY (username) REFERENCES users (username)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS workouts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            workout_type TEXT NOT NULL,
+            duration INTEGER NOT NULL,
+            calories INTEGER NOT NULL,
+            date TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS teams (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            creator TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS team_members (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            team_name TEXT NOT NULL,
+            username TEXT NOT NULL,
+            FOREIGN KEY (team_name) REFERENCES teams (name),
+            FOREIGN KEY (username) REFERENCES users (username),
+            UNIQUE(team_name, username)
+        )
+        """,
+    ]),
+    # Covers both get_workout_history (seek + ordered walk, no sort) and get_workout_summary
+    # (aggregate straight from the index without touching the table).
+    (2, "Covering index on workouts (username, date)", [
+        """
+        CREATE INDEX IF NOT EXISTS idx_workouts_username_date
+        ON workouts (username, date, workout_type, duration, calories)
+        """,
+    ]),
+    # team_members(team_name) is already served by the UNIQUE(team_name, username) index, which
+    # get_teams and get_team_members use; lookups by username (get_user_team, leave_team) were not.
+    (3, "Index team membership by username", [
+        "CREATE INDEX IF NOT EXISTS idx_team_members_username ON team_members (username, team_name)",
+    ]),
+    # Per-user lifetime totals kept in step with `workouts` by triggers, so the dashboard summary
+    # is a single primary-key lookup however much history the user has.
+    (4, "Trigger-maintained workout_totals", [
+        """
+        CREATE TABLE IF NOT EXISTS workout_totals (
+            username TEXT PRIMARY KEY,
+            total_workouts INTEGER NOT NULL DEFAULT 0,
+            total_time INTEGER NOT NULL DEFAULT 0,
+            total_calories INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """,
+        """
+        INSERT INTO workout_totals (username, total_workouts, total_time, total_calories)
+        SELECT username, COUNT(*), COALESCE(SUM(duration), 0), COALESCE(SUM(calories), 0)
+        FROM workouts GROUP BY username
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_workout_totals_insert AFTER INSERT ON workouts
+        BEGIN
+            INSERT INTO workout_totals (username, total_workouts, total_time, total_calories)
+            VALUES (NEW.username, 1, NEW.duration, NEW.calories)
+            ON CONFLICT (username) DO UPDATE SET
+                total_workouts = total_workouts + 1,
+                total_time = total_time + excluded.total_time,
+                total_calories = total_calories + excluded.total_calories;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_workout_totals_delete AFTER DELETE ON workouts
+        BEGIN
+            UPDATE workout_totals SET
+                total_workouts = total_workouts - 1,
+                total_time = total_time - OLD.duration,
+                total_calories = total_calories - OLD.calories
+            WHERE username = OLD.username;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_workout_totals_update AFTER UPDATE OF username, duration, calories ON workouts
+        BEGIN
+            UPDATE workout_totals SET
+                total_workouts = total_workouts - 1,
+                total_time = total_time - OLD.duration,
+                total_calories = total_calories - OLD.calories
+            WHERE username = OLD.username;
+            INSERT INTO workout_totals (username, total_workouts, total_time, total_calories)
+            VALUES (NEW.username, 1, NEW.duration, NEW.calories)
+            ON CONFLICT (username) DO UPDATE SET
+                total_workouts = total_workouts + 1,
+                total_time = total_time + excluded.total_time,
+                total_calories = total_calories + excluded.total_calories;
+        END
+        """,
+    ]),
+    # Daily/weekly/monthly rollups per user and workout type, kept incrementally by triggers so
+    # range analytics read a handful of pre-aggregated rows instead of raw workout history.
+    # Rows that drop to zero workouts are left in place and filtered out at query time.
+    (5, "Trigger-maintained workout_rollups", [
+        """
+        CREATE TABLE IF NOT EXISTS workout_rollups (
+            username TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            period_start TEXT NOT NULL,
+            workout_type TEXT NOT NULL,
+            workouts INTEGER NOT NULL DEFAULT 0,
+            duration INTEGER NOT NULL DEFAULT 0,
+            calories INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (username, bucket, period_start, workout_type)
+        ) WITHOUT ROWID
+        """,
+        f"""
+        INSERT INTO workout_rollups (username, bucket, period_start, workout_type, workouts, duration, calories)
+        {_rollup_backfill()}
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_workout_rollups_insert AFTER INSERT ON workouts
+        BEGIN
+            INSERT INTO workout_rollups (username, bucket, period_start, workout_type, workouts, duration, calories)
+            SELECT NEW.username, p.bucket, p.period_start, NEW.workout_type, 1, NEW.duration, NEW.calories
+            FROM ({_rollup_periods("NEW.date")}) p WHERE true
+            ON CONFLICT (username, bucket, period_start, workout_type) DO UPDATE SET
+                workouts = workouts + 1,
+                duration = duration + excluded.duration,
+                calories = calories + excluded.calories;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_workout_rollups_delete AFTER DELETE ON workouts
+        BEGIN
+            UPDATE workout_rollups SET
+                workouts = workouts - 1,
+                duration = duration - OLD.duration,
+                calories = calories - OLD.calories
+            WHERE username = OLD.username AND workout_type = OLD.workout_type
+              AND (bucket, period_start) IN ({_rollup_periods("OLD.date")});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_workout_rollups_update
+        AFTER UPDATE OF username, workout_type, duration, calories, date ON workouts
+        BEGIN
+            UPDATE workout_rollups SET
+                workouts = workouts - 1,
+                duration = duration - OLD.duration,
+                calories = calories - OLD.calories
+            WHERE username = OLD.username AND workout_type = OLD.workout_type
+              AND (bucket, period_start) IN ({_rollup_periods("OLD.date")});
+            INSERT INTO workout_rollups (username, bucket, period_start, workout_type, workouts, duration, calories)
+            SELECT NEW.username, p.bucket, p.period_start, NEW.workout_type, 1, NEW.duration, NEW.calories
+            FROM ({_rollup_periods("NEW.date")}) p WHERE true
+            ON CONFLICT (username, bucket, period_start, workout_type) DO UPDATE SET
+                workouts = workouts + 1,
+                duration = duration + excluded.duration,
+                calories = calories + excluded.calories;
+        END
+        """,
+    ]),
+    # Lets bulk imports be re-run safely: rows carrying the same dedupe_key are inserted once.
+    (6, "Add workouts.dedupe_key for idempotent imports", [
+        "ALTER TABLE workouts ADD COLUMN dedupe_key TEXT",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_workouts_dedupe_key ON workouts (dedupe_key) WHERE dedupe_key IS NOT NULL",
+    ]),
+    # Keyset pagination walks (username, date DESC, id DESC); putting id right after date lets the
+    # index deliver that order directly while still covering the history columns.
+    (7, "Keyset-friendly covering index on workouts (username, date, id)", [
+        "DROP INDEX IF EXISTS idx_workouts_username_date",
+        """
+        CREATE INDEX IF NOT EXISTS idx_workouts_username_date_id
+        ON workouts (username, date, id, workout_type, duration, calories)
+        """,
+    ]),
+    # Team leaderboards: per-team daily and all-time totals over the team's current members,
+    # maintained by triggers on workouts (new activity) and team_members (joins/leaves), so
+    # rankings are read from small pre-aggregated tables instead of joining raw workouts.
+    (8, "Trigger-maintained team leaderboards", [
+        """
+        CREATE TABLE IF NOT EXISTS team_daily_totals (
+            team_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            workouts INTEGER NOT NULL DEFAULT 0,
+            minutes INTEGER NOT NULL DEFAULT 0,
+            calories INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (team_id, day)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_team_daily_totals_day ON team_daily_totals (day, team_id, workouts, minutes, calories)",
+        """
+        CREATE TABLE IF NOT EXISTS team_totals (
+            team_id INTEGER PRIMARY KEY,
+            workouts INTEGER NOT NULL DEFAULT 0,
+            minutes INTEGER NOT NULL DEFAULT 0,
+            calories INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_team_totals_calories ON team_totals (calories DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_team_totals_minutes ON team_totals (minutes DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_team_totals_workouts ON team_totals (workouts DESC)",
+        # Materialized rolling windows; as_of is the last day each window was rolled forward to.
+        """
+        CREATE TABLE IF NOT EXISTS leaderboard_windows (
+            window_days INTEGER PRIMARY KEY,
+            as_of TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS team_window_totals (
+            window_days INTEGER NOT NULL,
+            team_id INTEGER NOT NULL,
+            workouts INTEGER NOT NULL DEFAULT 0,
+            minutes INTEGER NOT NULL DEFAULT 0,
+            calories INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (window_days, team_id)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_team_window_totals_calories ON team_window_totals (window_days, calories DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_team_window_totals_minutes ON team_window_totals (window_days, minutes DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_team_window_totals_workouts ON team_window_totals (window_days, workouts DESC)",
+        "INSERT OR IGNORE INTO leaderboard_windows (window_days, as_of) VALUES "
+        + ", ".join(f"({days}, date('now', 'localtime'))" for days in LEADERBOARD_WINDOWS),
+        """
+        INSERT INTO team_daily_totals (team_id, day, workouts, minutes, calories)
+        SELECT t.id, r.period_start, SUM(r.workouts), SUM(r.duration), SUM(r.calories)
+        FROM team_members m
+        JOIN teams t ON t.name = m.team_name
+        JOIN workout_rollups r ON r.username = m.username AND r.bucket = 'day'
+        GROUP BY t.id, r.period_start
+        """,
+        """
+        INSERT INTO team_totals (team_id, workouts, minutes, calories)
+        SELECT t.id, COALESCE(SUM(w.total_workouts), 0), COALESCE(SUM(w.total_time), 0), COALESCE(SUM(w.total_calories), 0)
+        FROM teams t
+        LEFT JOIN team_members m ON m.team_name = t.name
+        LEFT JOIN workout_totals w ON w.username = m.username
+        GROUP BY t.id
+        """,
+        _TEAM_LEADERBOARD_BACKFILL_WINDOWS,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_team_totals_workout_insert AFTER INSERT ON workouts
+        BEGIN
+            INSERT INTO team_daily_totals (team_id, day, workouts, minutes, calories)
+            SELECT t.id, date(NEW.date), 1, NEW.duration, NEW.calories
+            FROM team_members m JOIN teams t ON t.name = m.team_name
+            WHERE m.username = NEW.username
+            ON CONFLICT (team_id, day) DO UPDATE SET
+                workouts = workouts + 1,
+                minutes = minutes + excluded.minutes,
+                calories = calories + excluded.calories;
+            INSERT INTO team_totals (team_id, workouts, minutes, calories)
+            SELECT t.id, 1, NEW.duration, NEW.calories
+            FROM team_members m JOIN teams t ON t.name = m.team_name
+            WHERE m.username = NEW.username
+            ON CONFLICT (team_id) DO UPDATE SET
+                workouts = workouts + 1,
+                minutes = minutes + excluded.minutes,
+                calories = calories + excluded.calories;
+            INSERT INTO team_window_totals (window_days, team_id, workouts, minutes, calories)
+            SELECT lw.window_days, t.id, 1, NEW.duration, NEW.calories
+            FROM team_members m JOIN teams t ON t.name = m.team_name JOIN leaderboard_windows lw
+            WHERE m.username = NEW.username AND date(NEW.date) >= {_WINDOW_START_SQL}
+            ON CONFLICT (window_days, team_id) DO UPDATE SET
+                workouts = workouts + 1,
+                minutes = minutes + excluded.minutes,
+                calories = calories + excluded.calories;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_team_totals_workout_delete AFTER DELETE ON workouts
+        BEGIN
+            UPDATE team_daily_totals SET
+                workouts = workouts - 1,
+                minutes = minutes - OLD.duration,
+                calories = calories - OLD.calories
+            WHERE day = date(OLD.date) AND team_id IN (
+                SELECT t.id FROM team_members m JOIN teams t ON t.name = m.team_name WHERE m.username = OLD.username);
+            UPDATE team_totals SET
+                workouts = workouts - 1,
+                minutes = minutes - OLD.duration,
+                calories = calories - OLD.calories
+            WHERE team_id IN (
+                SELECT t.id FROM team_members m JOIN teams t ON t.name = m.team_name WHERE m.username = OLD.username);
+            UPDATE team_window_totals SET
+                workouts = workouts - 1,
+                minutes = minutes - OLD.duration,
+                calories = calories - OLD.calories
+            WHERE team_id IN (
+                SELECT t.id FROM team_members m JOIN teams t ON t.name = m.team_name WHERE m.username = OLD.username)
+              AND window_days IN (
+                SELECT lw.window_days FROM leaderboard_windows lw WHERE date(OLD.date) >= {_WINDOW_START_SQL});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_team_totals_workout_update
+        AFTER UPDATE OF username, duration, calories, date ON workouts
+        BEGIN
+            UPDATE team_daily_totals SET
+                workouts = workouts - 1,
+                minutes = minutes - OLD.duration,
+                calories = calories - OLD.calories
+            WHERE day = date(OLD.date) AND team_id IN (
+                SELECT t.id FROM team_members m JOIN teams t ON t.name = m.team_name WHERE m.username = OLD.username);
+            UPDATE team_totals SET
+                workouts = workouts - 1,
+                minutes = minutes - OLD.duration,
+                calories = calories - OLD.calories
+            WHERE team_id IN (
+                SELECT t.id FROM team_members m JOIN teams t ON t.name = m.team_name WHERE m.username = OLD.username);
+            UPDATE team_window_totals SET
+                workouts = workouts - 1,
+                minutes = minutes - OLD.duration,
+                calories = calories - OLD.calories
+            WHERE team_id IN (
+                SELECT t.id FROM team_members m JOIN teams t ON t.name = m.team_name WHERE m.username = OLD.username)
+              AND window_days IN (
+                SELECT lw.window_days FROM leaderboard_windows lw WHERE date(OLD.date) >= {_WINDOW_START_SQL});
+            INSERT INTO team_daily_totals (team_id, day, workouts, minutes, calories)
+            SELECT t.id, date(NEW.date), 1, NEW.duration, NEW.calories
+            FROM team_members m JOIN teams t ON t.name = m.team_name
+            WHERE m.username = NEW.username
+            ON CONFLICT (team_id, day) DO UPDATE SET
+                workouts = workouts + 1,
+                minutes = minutes + excluded.minutes,
+                calories = calories + excluded.calories;
+            INSERT INTO team_totals (team_id, workouts, minutes, calories)
+            SELECT t.id, 1, NEW.duration, NEW.calories
+            FROM team_members m JOIN teams t ON t.name = m.team_name
+            WHERE m.username = NEW.username
+            ON CONFLICT (team_id) DO UPDATE SET
+                workouts = workouts + 1,
+                minutes = minutes + excluded.minutes,
+                calories = calories + excluded.calories;
+            INSERT INTO team_window_totals (window_days, team_id, workouts, minutes, calories)
+            SELECT lw.window_days, t.id, 1, NEW.duration, NEW.calories
+            FROM team_members m JOIN teams t ON t.name = m.team_name JOIN leaderboard_windows lw
+            WHERE m.username = NEW.username AND date(NEW.date) >= {_WINDOW_START_SQL}
+            ON CONFLICT (window_days, team_id) DO UPDATE SET
+                workouts = workouts + 1,
+                minutes = minutes + excluded.minutes,
+                calories = calories + excluded.calories;
+        END
+        """,
+        # Joining brings the member's whole history onto the team's board; leaving takes it off.
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_team_totals_member_insert AFTER INSERT ON team_members
+        BEGIN
+            INSERT INTO team_daily_totals (team_id, day, workouts, minutes, calories)
+            SELECT t.id, r.period_start, SUM(r.workouts), SUM(r.duration), SUM(r.calories)
+            FROM workout_rollups r JOIN teams t ON t.name = NEW.team_name
+            WHERE r.username = NEW.username AND r.bucket = 'day'
+            GROUP BY r.period_start
+            ON CONFLICT (team_id, day) DO UPDATE SET
+                workouts = workouts + excluded.workouts,
+                minutes = minutes + excluded.minutes,
+                calories = calories + excluded.calories;
+            INSERT INTO team_totals (team_id, workouts, minutes, calories)
+            SELECT t.id, COALESCE(w.total_workouts, 0), COALESCE(w.total_time, 0), COALESCE(w.total_calories, 0)
+            FROM teams t LEFT JOIN workout_totals w ON w.username = NEW.username
+            WHERE t.name = NEW.team_name
+            ON CONFLICT (team_id) DO UPDATE SET
+                workouts = workouts + excluded.workouts,
+                minutes = minutes + excluded.minutes,
+                calories = calories + excluded.calories;
+            INSERT INTO team_window_totals (window_days, team_id, workouts, minutes, calories)
+            SELECT lw.window_days, t.id, SUM(r.workouts), SUM(r.duration), SUM(r.calories)
+            FROM workout_rollups r JOIN teams t ON t.name = NEW.team_name JOIN leaderboard_windows lw
+            WHERE r.username = NEW.username AND r.bucket = 'day' AND r.period_start >= {_WINDOW_START_SQL}
+            GROUP BY lw.window_days, t.id
+            ON CONFLICT (window_days, team_id) DO UPDATE SET
+                workouts = workouts + excluded.workouts,
+                minutes = minutes + excluded.minutes,
+                calories = calories + excluded.calories;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_team_totals_member_delete AFTER DELETE ON team_members
+        BEGIN
+            UPDATE team_daily_totals SET
+                workouts = team_daily_totals.workouts - r.workouts,
+                minutes = team_daily_totals.minutes - r.minutes,
+                calories = team_daily_totals.calories - r.calories
+            FROM (
+                SELECT period_start AS day, SUM(workouts) AS workouts, SUM(duration) AS minutes, SUM(calories) AS calories
+                FROM workout_rollups WHERE username = OLD.username AND bucket = 'day' GROUP BY period_start
+            ) r
+            WHERE team_daily_totals.day = r.day
+              AND team_daily_totals.team_id = (SELECT id FROM teams WHERE name = OLD.team_name);
+            UPDATE team_totals SET
+                workouts = team_totals.workouts - w.total_workouts,
+                minutes = team_totals.minutes - w.total_time,
+                calories = team_totals.calories - w.total_calories
+            FROM workout_totals w
+            WHERE w.username = OLD.username
+              AND team_totals.team_id = (SELECT id FROM teams WHERE name = OLD.team_name);
+            UPDATE team_window_totals SET
+                workouts = team_window_totals.workouts - x.workouts,
+                minutes = team_window_totals.minutes - x.minutes,
+                calories = team_window_totals.calories - x.calories
+            FROM (
+                SELECT lw.window_days, SUM(r.workouts) AS workouts, SUM(r.duration) AS minutes, SUM(r.calories) AS calories
+                FROM workout_rollups r JOIN leaderboard_windows lw
+                WHERE r.username = OLD.username AND r.bucket = 'day' AND r.period_start >= {_WINDOW_START_SQL}
+                GROUP BY lw.window_days
+            ) x
+            WHERE team_window_totals.window_days = x.window_days
+              AND team_window_totals.team_id = (SELECT id FROM teams WHERE name = OLD.team_name);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_team_totals_team_delete AFTER DELETE ON teams
+        BEGIN
+            DELETE FROM team_daily_totals WHERE team_id = OLD.id;
+            DELETE FROM team_totals WHERE team_id = OLD.id;
+            DELETE FROM team_window_totals WHERE team_id = OLD.id;
+        END
+        """,
+    ]),
+    # Integer surrogate keys: memberships and measurements point at teams.id/users.id with
+    # ON DELETE CASCADE (enforced via PRAGMA foreign_keys on every connection). Rows whose
+    # team or user no longer exists cannot be expressed any more and are dropped. The
+    # leaderboard triggers that read team_members are recreated for the new columns.
+    (9, "Integer foreign keys for team_members and body_measurements", [
+        "DROP TRIGGER IF EXISTS trg_team_totals_workout_insert",
+        "DROP TRIGGER IF EXISTS trg_team_totals_workout_delete",
+        "DROP TRIGGER IF EXISTS trg_team_totals_workout_update",
+        """
+        CREATE TABLE team_members_new (
+            team_id INTEGER NOT NULL REFERENCES teams (id) ON DELETE CASCADE,
+            user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            PRIMARY KEY (team_id, user_id)
+        ) WITHOUT ROWID
+        """,
+        """
+        INSERT OR IGNORE INTO team_members_new (team_id, user_id)
+        SELECT t.id, u.id
+        FROM team_members m
+        JOIN teams t ON t.name = m.team_name
+        JOIN users u ON u.username = m.username
+        """,
+        "DROP TABLE team_members",
+        "ALTER TABLE team_members_new RENAME TO team_members",
+        "CREATE INDEX IF NOT EXISTS idx_team_members_user ON team_members (user_id, team_id)",
+        """
+        CREATE TABLE body_measurements_new (
+            user_id INTEGER PRIMARY KEY REFERENCES users (id) ON DELETE CASCADE,
+            weight REAL DEFAULT 0,
+            height REAL DEFAULT 0,
+            body_fat REAL DEFAULT 0,
+            bmi REAL DEFAULT 0
+        )
+        """,
+        """
+        INSERT INTO body_measurements_new (user_id, weight, height, body_fat, bmi)
+        SELECT u.id, b.weight, b.height, b.body_fat, b.bmi
+        FROM body_measurements b JOIN users u ON u.username = b.username
+        """,
+        "DROP TABLE body_measurements",
+        "ALTER TABLE body_measurements_new RENAME TO body_measurements",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_team_totals_workout_insert AFTER INSERT ON workouts
+        BEGIN
+            {_team_workout_add_sql()}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_team_totals_workout_delete AFTER DELETE ON workouts
+        BEGIN
+            {_team_workout_remove_sql()}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_team_totals_workout_update
+        AFTER UPDATE OF username, duration, calories, date ON workouts
+        BEGIN
+            {_team_workout_remove_sql()}
+            {_team_workout_add_sql()}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_team_totals_member_insert AFTER INSERT ON team_members
+        BEGIN
+            INSERT INTO team_daily_totals (team_id, day, workouts, minutes, calories)
+            SELECT NEW.team_id, r.period_start, SUM(r.workouts), SUM(r.duration), SUM(r.calories)
+            FROM workout_rollups r
+            WHERE r.username = (SELECT username FROM users WHERE id = NEW.user_id) AND r.bucket = 'day'
+            GROUP BY r.period_start
+            ON CONFLICT (team_id, day) DO UPDATE SET
+                workouts = workouts + excluded.workouts,
+                minutes = minutes + excluded.minutes,
+                calories = calories + excluded.calories;
+            INSERT INTO team_totals (team_id, workouts, minutes, calories)
+            SELECT NEW.team_id, COALESCE(w.total_workouts, 0), COALESCE(w.total_time, 0), COALESCE(w.total_calories, 0)
+            FROM users u LEFT JOIN workout_totals w ON w.username = u.username
+            WHERE u.id = NEW.user_id
+            ON CONFLICT (team_id) DO UPDATE SET
+                workouts = workouts + excluded.workouts,
+                minutes = minutes + excluded.minutes,
+                calories = calories + excluded.calories;
+            INSERT INTO team_window_totals (window_days, team_id, workouts, minutes, calories)
+            SELECT lw.window_days, NEW.team_id, SUM(r.workouts), SUM(r.duration), SUM(r.calories)
+            FROM workout_rollups r JOIN leaderboard_windows lw
+            WHERE r.username = (SELECT username FROM users WHERE id = NEW.user_id) AND r.bucket = 'day'
+              AND r.period_start >= {_WINDOW_START_SQL}
+            GROUP BY lw.window_days
+            ON CONFLICT (window_days, team_id) DO UPDATE SET
+                workouts = workouts + excluded.workouts,
+                minutes = minutes + excluded.minutes,
+                calories = calories + excluded.calories;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_team_totals_member_delete AFTER DELETE ON team_members
+        BEGIN
+            UPDATE team_daily_totals SET
+                workouts = team_daily_totals.workouts - r.workouts,
+                minutes = team_daily_totals.minutes - r.minutes,
+                calories = team_daily_totals.calories - r.calories
+            FROM (
+                SELECT period_start AS day, SUM(workouts) AS workouts, SUM(duration) AS minutes, SUM(calories) AS calories
+                FROM workout_rollups
+                WHERE username = (SELECT username FROM users WHERE id = OLD.user_id) AND bucket = 'day'
+                GROUP BY period_start
+            ) r
+            WHERE team_daily_totals.team_id = OLD.team_id AND team_daily_totals.day = r.day;
+            UPDATE team_totals SET
+                workouts = team_totals.workouts - w.total_workouts,
+                minutes = team_totals.minutes - w.total_time,
+                calories = team_totals.calories - w.total_calories
+            FROM workout_totals w
+            WHERE w.username = (SELECT username FROM users WHERE id = OLD.user_id)
+              AND team_totals.team_id = OLD.team_id;
+            UPDATE team_window_totals SET
+                workouts = team_window_totals.workouts - x.workouts,
+                minutes = team_window_totals.minutes - x.minutes,
+                calories = team_window_totals.calories - x.calories
+            FROM (
+                SELECT lw.window_days, SUM(r.workouts) AS workouts, SUM(r.duration) AS minutes, SUM(r.calories) AS calories
+                FROM workout_rollups r JOIN leaderboard_windows lw
+                WHERE r.username = (SELECT username FROM users WHERE id = OLD.user_id) AND r.bucket = 'day'
+                  AND r.period_start >= {_WINDOW_START_SQL}
+                GROUP BY lw.window_days
+            ) x
+            WHERE team_window_totals.window_days = x.window_days AND team_window_totals.team_id = OLD.team_id;
+        END
+        """,
+        # Dropped orphan memberships may have counted towards a team; start from a clean slate.
+        "DELETE FROM team_daily_totals",
+        "DELETE FROM team_totals",
+        "DELETE FROM team_window_totals",
+        _TEAM_LEADERBOARD_BACKFILL_DAILY,
+        _TEAM_LEADERBOARD_BACKFILL_TOTALS,
+        _TEAM_LEADERBOARD_BACKFILL_WINDOWS,
+    ]),
+    # Per-user favorite meals, kept in the order they were added.
+    (10, "Favorite meals", [
+        """
+        CREATE TABLE IF NOT EXISTS favorites (
+            user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            meal TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            PRIMARY KEY (user_id, meal)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_favorites_user_position ON favorites (user_id, position)",
+    ]),
+    # Workouts logged in the app had no dedupe key, so re-importing an export duplicated them.
+    (11, "Backfill dedupe keys for app-logged workouts", [
+        _backfill_dedupe_keys,
+    ]),
+]
+
+
+def _window_start(days):
+    """First day (YYYY-MM-DD) of a rolling window of `days` days ending today."""
+    return (date.today() - timedelta(days=days - 1)).isoformat()
+
+
+def _ranked(rows, name_key):
+    """Turns (name, workouts, minutes, calories) rows into ranked leaderboard dicts."""
+    return [
+        {"rank": rank, name_key: row[0], "workouts": row[1], "minutes": row[2], "calories": row[3]}
+        for rank, row in enumerate(rows, start=1)
+    ]
+
+
+class ConnectionManager:
+    """Hands out one long-lived connection per thread and bootstraps the schema once."""
+
+    def __init__(self, path=DB_PATH, profile=None, tracer=None):
+        self.path = path
+        self.profile = resolve_storage_profile(profile)
+        self.tracer = tracer or env_tracer()  # Optional QueryTracer for every connection
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self._schema_ready = False
+        self.events = EventBus()  # Change events from every Database this manager lends out
+
+    def connection(self):
+        """Returns the calling thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Each thread only ever uses its own connection; the flag just lets close() run from any thread.
+            connect = self.tracer.connect if self.tracer else sqlite3.connect
+            conn = connect(self.path, isolation_level=None, check_same_thread=False)  # Auto-commit mode
+            conn.execute("PRAGMA foreign_keys = ON")  # Per connection; needed for ON DELETE CASCADE
+            settings = apply_storage_profile(conn, self.profile)
+            with self._lock:
+                if not self._schema_ready:
+                    summary = ", ".join(f"{pragma}={value}" for pragma, value in settings.items())
+                    print(f"Storage profile '{self.profile}' on {self.path}: {summary}", file=sys.stderr)
+                    Database(conn).create_tables()
+                    self._schema_ready = True
+                self._connections.append(conn)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def database(self):
+        """Lends a Database bound to this thread's shared connection."""
+        db = Database(self.connection(), self.events)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def close(self):
+        """Closes every connection opened by this manager."""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+class Database:
+    def __init__(self, conn=None, events=None):
+        # A borrowed connection is owned by the ConnectionManager; a standalone Database opens its own.
+        self._owns_conn = conn is None
+        if conn is None:
+            tracer = env_tracer()
+            conn = (tracer.connect if tracer else sqlite3.connect)(DB_PATH, isolation_level=None)  # Auto-commit mode
+            conn.execute("PRAGMA foreign_keys = ON")
+            apply_storage_profile(conn, resolve_storage_profile())
+        self.conn = conn
+        self.cursor = self.conn.cursor()
+        self.events = events  # EventBus that committed writes are published to, if any
+        self._bulk_inserted = None  # Rows added so far inside bulk_load(), None outside it
+        if self._owns_conn:
+            self.create_tables()
+
+    def create_tables(self):
+        """Brings the schema up to date by applying any pending migrations."""
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TEXT NOT NULL
+            )
+        """)
+        current = self.get_schema_version()
+
+        for version, description, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            self.cursor.execute("BEGIN IMMEDIATE")
+            if self.get_schema_version() >= version:
+                self.cursor.execute("ROLLBACK")  # Another connection applied it first
+                continue
+            try:
+                for statement in statements:
+                    statement(self.cursor) if callable(statement) else self.cursor.execute(statement)
+                self.cursor.execute("INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                                    (version, description, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            except sqlite3.Error:
+                self.cursor.execute("ROLLBACK")
+                raise
+            self.cursor.execute("COMMIT")
+            print(f"Applied schema migration {version}: {description}", file=sys.stderr)  # Debugging log
+
+    def get_schema_version(self):
+        """Returns the highest migration version applied to the database (0 if none)."""
+        self.cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+        return self.cursor.fetchone()[0]
+
+    def _publish(self, event):
+        """Publishes a change event for a committed write (see data/events.py)."""
+        if self.events is not None:
+            self.events.publish(event)
+
+    def hash_password(self, password):
+        """Hashes the password with the configured salted KDF (see passwords.py)."""
+        return passwords.hash_password(password)
+
+    def add_user(self, username, email, password):
+        """Registers a new user and returns a status message."""
+        try:
+            hashed_password = self.hash_password(password)
+            with self.conn:
+                self.cursor.execute("INSERT INTO users (username, email, password, join_date) VALUES (?, ?, ?, ?)",
+                                    (username, email, hashed_password, datetime.now().strftime("%Y-%m-%d")))
+            return "User registered successfully!"
+        except sqlite3.IntegrityError:
+            return "Username or email already exists."
+
+    def validate_user(self, username, password):
+        """Validates user credentials and returns user info if valid.
+
+        Verification runs the (deliberately slow) KDF, so call this off the UI thread.
+        Legacy SHA-256 and under-cost hashes are transparently upgraded on success.
+        """
+        self.cursor.execute("SELECT id, username, email, password FROM users WHERE username=?", (username,))
+        row = self.cursor.fetchone()
+        if row is None:
+            passwords.hash_password(password)  # Same cost as a real check, so timing does not reveal usernames
+            return None
+        if not passwords.verify_password(password, row[3]):
+            return None
+
+        if passwords.needs_rehash(row[3]):
+            with self.conn:
+                self.cursor.execute("UPDATE users SET password=? WHERE id=? AND password=?",
+                                    (self.hash_password(password), row[0], row[3]))
+        return row[:3]
+
+    def get_email(self, username):
+        """Fetches the email associated with a username."""
+        self.cursor.execute("SELECT email FROM users WHERE username=?", (username,))
+        result = self.cursor.fetchone()
+        return result[0] if result else None
+
+    def get_user_info(self, username):
+        """Fetch user details and body measurements."""
+        self.cursor.execute("""
+            SELECT u.username, u.email, u.join_date,
+                   COALESCE(b.weight, 0), COALESCE(b.height, 0), COALESCE(b.body_fat, 0), COALESCE(b.bmi, 0)
+            FROM users u LEFT JOIN body_measurements b ON b.user_id = u.id
+            WHERE u.username = ?""", (username,))
+        user = self.cursor.fetchone()
+
+        if user is None:
+            return None  # Prevents crashing
+
+        return {
+            "username": user[0],
+            "email": user[1],
+            "join_date": user[2],
+            "weight": user[3],
+            "height": user[4],
+            "body_fat": user[5],
+            "bmi": user[6],
+        }
+
+    def update_measurements(self, username, weight, height, body_fat):
+        """Saves a user's body measurements and recomputes their BMI."""
+        bmi = round(weight / (height / 100) ** 2, 1) if height else 0
+        with self.conn:
+            self.cursor.execute("""
+                INSERT INTO body_measurements (user_id, weight, height, body_fat, bmi)
+                SELECT id, ?, ?, ?, ? FROM users WHERE username = ?
+                ON CONFLICT (user_id) DO UPDATE SET
+                    weight = excluded.weight, height = excluded.height,
+                    body_fat = excluded.body_fat, bmi = excluded.bmi""",
+                (weight, height, body_fat, bmi, username))
+        self._publish(MeasurementsUpdated(username, weight, height, body_fat, bmi))
+
+    # ==================== WORKOUT FUNCTIONS ==================== #
+    def add_workout(self, username, workout_type, duration, calories):
+        """Logs a new workout entry for a user.
+
+        The row gets a random dedupe key rather than one derived from its content: the same
+        workout logged twice within a second is two real workouts, yet an export still
+        carries the key, so re-importing it is recognized as the same row.
+        """
+        date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self.conn:
+            self.cursor.execute("""
+                INSERT INTO workouts (username, workout_type, duration, calories, date, dedupe_key)
+                VALUES (?, ?, ?, ?, ?, ?)""",
+                (username, workout_type, duration, calories, date, uuid.uuid4().hex)
+            )
+            workout_id = self.cursor.lastrowid
+        self._publish(WorkoutAdded(username, {"id": workout_id, "workout_type": workout_type, "duration": duration,
+                                              "calories": calories, "date": date}))
+
+    def add_workouts_bulk(self, username, workouts):
+        """Inserts many workouts in a single transaction and returns how many were added.
+
+        `workouts` is any iterable of dicts with workout_type, duration, calories and
+        optionally date (datetime or ISO string, defaults to now) and dedupe_key; rows without
+        a key get one from their content, as importer.dedupe_key computes it. Rows whose
+        dedupe_key already exists are skipped. When `username` is None each row must carry
+        its own "username". Inside bulk_load() the rows join its transaction instead.
+        """
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        def rows():
+            for workout in workouts:
+                date = workout.get("date") or now
+                if not isinstance(date, datetime):
+                    date = datetime.fromisoformat(str(date))
+                row = {"workout_type": workout["workout_type"], "duration": int(workout["duration"]),
+                       "calories": int(workout["calories"]), "date": date.strftime("%Y-%m-%d %H:%M:%S")}
+                user = username or workout["username"]
+                yield (user, row["workout_type"], row["duration"], row["calories"], row["date"],
+                       workout.get("dedupe_key") or dedupe_key(user, row))
+
+        insert = """
+            INSERT OR IGNORE INTO workouts (username, workout_type, duration, calories, date, dedupe_key)
+            VALUES (?, ?, ?, ?, ?, ?)"""
+        if self._bulk_inserted is not None:
+            self.cursor.executemany(insert, rows())
+            self._bulk_inserted += self.cursor.rowcount
+            return self.cursor.rowcount
+
+        self.cursor.execute("BEGIN IMMEDIATE")
+        try:
+            self.cursor.executemany(insert, rows())
+            inserted = self.cursor.rowcount
+        except Exception:
+            self.cursor.execute("ROLLBACK")
+            raise
+        self.cursor.execute("COMMIT")
+        if inserted:
+            self._publish(WorkoutsImported(username, inserted))  # None (several users) when rows carry their own
+        return inserted
+
+    @contextmanager
+    def bulk_load(self):
+        """Runs the add_workouts_bulk calls in the block as one load without per-row trigger work.
+
+        The workouts insert triggers are dropped for the load; workout_totals, the rollups and
+        the team leaderboards are then rebuilt once and the triggers recreated, all in the same
+        transaction, so nobody sees stale aggregates and a failed load leaves nothing behind.
+        The rebuild scans every workout, so this only pays off for large loads.
+        """
+        self.cursor.execute("BEGIN IMMEDIATE")
+        try:
+            self.cursor.execute("""
+                SELECT name, sql FROM sqlite_master
+                WHERE type = 'trigger' AND tbl_name = 'workouts' AND sql LIKE '%AFTER INSERT ON workouts%'""")
+            triggers = self.cursor.fetchall()
+            for name, _ in triggers:
+                self.cursor.execute(f"DROP TRIGGER {name}")
+            self._bulk_inserted = 0
+            yield
+            self._rebuild_workout_totals()
+            self._rebuild_workout_rollups()
+            self._rebuild_team_leaderboards()
+            for _, sql in triggers:
+                self.cursor.execute(sql)
+        except BaseException:
+            self.cursor.execute("ROLLBACK")
+            raise
+        finally:
+            inserted, self._bulk_inserted = self._bulk_inserted, None
+        self.cursor.execute("COMMIT")
+        if inserted:
+            self._publish(WorkoutsImported(None, inserted))
+
+    def get_workout_summary(self, username):
+        """Retrieves a summary of a user's workouts from the trigger-maintained totals."""
+        self.cursor.execute("""
+            SELECT total_workouts, total_time, total_calories
+            FROM workout_totals WHERE username=?""",
+            (username,))
+        result = self.cursor.fetchone() or (0, 0, 0)
+
+        return {
+            "total_workouts": result[0],
+            "total_time": result[1],
+            "total_calories": result[2]
+        }
+
+    def get_workout_history(self, username, limit=10):
+        """Fetches the last `limit` workout records for a user."""
+        self.cursor.execute("""
+            SELECT id, workout_type, duration, calories, date 
+            FROM workouts 
+            WHERE username=? 
+            ORDER BY date DESC 
+            LIMIT ?""", 
+            (username, limit))
+        
+        return [
+            {"id": row[0], "workout_type": row[1], "duration": row[2], "calories": row[3], "date": row[4]}
+            for row in self.cursor.fetchall()
+        ]
+
+    def get_workout_history_page(self, username, before=None, limit=20):
+        """Fetches one page of a user's workouts, newest first, using keyset pagination.
+
+        `before` is the (date, id) cursor returned with the previous page, or None for the
+        first page. Returns (rows, next_cursor); next_cursor is None once history is exhausted.
+        """
+        query = "SELECT id, workout_type, duration, calories, date FROM workouts WHERE username = ?"
+        params = [username]
+        if before is not None:
+            query += " AND (date, id) < (?, ?)"
+            params.extend(before)
+        query += " ORDER BY date DESC, id DESC LIMIT ?"
+        params.append(limit)
+        self.cursor.execute(query, params)
+
+        rows = [
+            {"id": row[0], "workout_type": row[1], "duration": row[2], "calories": row[3], "date": row[4]}
+            for row in self.cursor.fetchall()
+        ]
+        next_cursor = (rows[-1]["date"], rows[-1]["id"]) if len(rows) == limit else None
+        return rows, next_cursor
+
+    def iter_workouts(self, username=None, batch_size=1000):
+        """Yields workout dicts for one user (oldest first) or the whole table, batch by batch.
+
+        Uses its own cursor and fetchmany so memory stays constant however many rows match;
+        the generator must be consumed before the connection is used for writes.
+        """
+        cursor = self.conn.cursor()
+        try:
+            columns = "id, username, workout_type, duration, calories, date, dedupe_key"
+            if username is None:
+                cursor.execute(f"SELECT {columns} FROM workouts ORDER BY id")
+            else:
+                cursor.execute(f"SELECT {columns} FROM workouts WHERE username = ? ORDER BY date, id", (username,))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield {"id": row[0], "username": row[1], "workout_type": row[2], "duration": row[3],
+                           "calories": row[4], "date": row[5], "dedupe_key": row[6]}
+        finally:
+            cursor.close()
+
+    def get_workout_stats(self, username, start=None, end=None, bucket="day", workout_type=None, by_type=False):
+        """Returns per-period workout count, duration and calories from the rollup table.
+
+        `start` and `end` are inclusive dates (date/datetime or "YYYY-MM-DD" strings) and
+        may be omitted for an open range; `bucket` is "day", "week" or "month". Periods are
+        returned oldest first, optionally restricted to one `workout_type` or split by type.
+        """
+        if bucket not in ROLLUP_BUCKETS:
+            raise ValueError(f"Unknown bucket '{bucket}', expected one of {sorted(ROLLUP_BUCKETS)}")
+
+        query = """
+            SELECT period_start, {type_column} SUM(workouts), SUM(duration), SUM(calories)
+            FROM workout_rollups
+            WHERE username = ? AND bucket = ?"""
+        params = [username, bucket]
+        if start is not None:
+            # Align the start to its period so a range beginning mid-week still includes that week.
+            query += f" AND period_start >= {ROLLUP_BUCKETS[bucket].format('?')}"
+            params.append(str(start)[:10])
+        if end is not None:
+            query += " AND period_start <= ?"
+            params.append(str(end)[:10])
+        if workout_type is not None:
+            query += " AND workout_type = ?"
+            params.append(workout_type)
+        query += " GROUP BY period_start{group_type} HAVING SUM(workouts) > 0 ORDER BY period_start{group_type}"
+
+        query = query.format(type_column="workout_type," if by_type else "", group_type=", workout_type" if by_type else "")
+        self.cursor.execute(query, params)
+
+        stats = []
+        for row in self.cursor.fetchall():
+            entry = {"period": row[0], "workouts": row[-3], "duration": row[-2], "calories": row[-1]}
+            if by_type:
+                entry["workout_type"] = row[1]
+            stats.append(entry)
+        return stats
+
+    # ==================== TEAMS FUNCTIONS ==================== #
+    def get_user_team(self, username):
+        """Returns the team name of the user, or None if not in a team."""
+        self.cursor.execute("""
+            SELECT t.name FROM users u
+            JOIN team_members m ON m.user_id = u.id
+            JOIN teams t ON t.id = m.team_id
+            WHERE u.username = ?""", (username,))
+        result = self.cursor.fetchone()
+    
+        if result:
+            return result[0]  # Return team name
+        else:
+            return None  # No team found
+
+    def get_teams(self):
+        """Fetches all teams from the database along with the number of members."""
+        self.cursor.execute("""
+            SELECT teams.name, COUNT(team_members.user_id)
+            FROM teams
+            LEFT JOIN team_members ON team_members.team_id = teams.id
+            GROUP BY teams.id
+        """)
+        teams = self.cursor.fetchall()
+
+        return [{"name": row[0], "members": row[1]} for row in teams]
+    
+    def join_team(self, team_name, username):
+        """Allows a user to join an existing team if they are not already in it."""
+        self.cursor.execute("SELECT id FROM teams WHERE name = ?", (team_name,))
+        team = self.cursor.fetchone()
+        if not team:
+            return False  # Team does not exist
+
+        with self.conn:
+            self.cursor.execute("""
+                INSERT OR IGNORE INTO team_members (team_id, user_id)
+                SELECT ?, id FROM users WHERE username = ?""", (team[0], username))
+            if self.cursor.rowcount != 1:
+                return False  # Already a member, or no such user
+        self._publish(TeamJoined(username, team_name))
+        return True  # Successfully joined the team
+
+
+
+    def add_team(self, team_name, username):
+        """Creates a new team and assigns the creator as the admin."""
+        self.cursor.execute("SELECT name FROM teams WHERE name = ?", (team_name,))
+        if self.cursor.fetchone():
+            return False  # Team already exists
+
+        self.cursor.execute("BEGIN IMMEDIATE")
+        try:
+            self.cursor.execute("INSERT INTO teams (name, creator) VALUES (?, ?)", (team_name, username))
+            self.cursor.execute("""
+                INSERT INTO team_members (team_id, user_id)
+                SELECT ?, id FROM users WHERE username = ?""", (self.cursor.lastrowid, username))
+        except sqlite3.Error:
+            self.cursor.execute("ROLLBACK")
+            raise
+        self.cursor.execute("COMMIT")
+        self._publish(TeamJoined(username, team_name, admin=True))
+        return True  # Team created successfully
+
+
+    def is_team_admin(self, username, team_name):
+        """Checks if a user is the admin (creator) of a given team."""
+        self.cursor.execute("SELECT creator FROM teams WHERE name = ?", (team_name,))
+        result = self.cursor.fetchone()
+    
+        return bool(result and result[0] == username)
+        
+    def get_team_members(self, team_name):
+        """Returns all members of a given team."""
+        self.cursor.execute("""
+            SELECT u.username FROM teams t
+            JOIN team_members m ON m.team_id = t.id
+            JOIN users u ON u.id = m.user_id
+            WHERE t.name = ?""", (team_name,))
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def leave_team(self, username):
+        """Removes the user from their team."""
+        team_name = self.get_user_team(username)
+        if not team_name:
+            return False
+
+        with self.conn:
+            self.cursor.execute(
+                "DELETE FROM team_members WHERE user_id = (SELECT id FROM users WHERE username = ?)", (username,))
+        self._publish(TeamLeft(username, team_name))
+
+        return True
+
+    def remove_member(self, admin_username, team_name, member):
+        """Removes another member from the team (Admin Only)."""
+        if member == admin_username or not self.is_team_admin(admin_username, team_name):
+            return False
+
+        with self.conn:
+            self.cursor.execute("""
+                DELETE FROM team_members
+                WHERE team_id = (SELECT id FROM teams WHERE name = ?)
+                  AND user_id = (SELECT id FROM users WHERE username = ?)""", (team_name, member))
+            removed = self.cursor.rowcount > 0
+        if removed:
+            self._publish(TeamLeft(member, team_name, removed_by=admin_username))
+
+        return removed
+
+    def delete_team(self, admin_username, team_name):
+        """Deletes the team and removes all members (Admin Only)."""
+        if not self.is_team_admin(admin_username, team_name):
+            return False
+
+        with self.conn:
+            self.cursor.execute("DELETE FROM teams WHERE name = ?", (team_name,))  # Memberships cascade
+        self._publish(TeamDeleted(None, team_name))  # Every former member is affected
+
+        return True
+
+    def get_team_leaderboard(self, metric="calories", days=None, limit=10):
+        """Ranks teams by total calories, minutes or workouts of their members.
+
+        With `days` only the last `days` days (today included) count. All-time totals and
+        the LEADERBOARD_WINDOWS windows are read straight off the metric's index; other
+        window lengths aggregate the daily totals. Returns the top `limit` teams.
+        """
+        if metric not in LEADERBOARD_METRICS:
+            raise ValueError(f"Unknown metric '{metric}', expected one of {LEADERBOARD_METRICS}")
+
+        if days is None:
+            self.cursor.execute(f"""
+                SELECT teams.name, tt.workouts, tt.minutes, tt.calories
+                FROM team_totals tt JOIN teams ON teams.id = tt.team_id
+                WHERE +tt.workouts > 0  -- unary + keeps the planner on the metric index (no sort)
+                ORDER BY tt.{metric} DESC LIMIT ?""", (limit,))
+        elif days in LEADERBOARD_WINDOWS:
+            self._roll_leaderboard_window(days)
+            self.cursor.execute(f"""
+                SELECT teams.name, w.workouts, w.minutes, w.calories
+                FROM team_window_totals w JOIN teams ON teams.id = w.team_id
+                WHERE w.window_days = ? AND +w.workouts > 0  -- see above: walk the metric index
+                ORDER BY w.{metric} DESC LIMIT ?""", (days, limit))
+        else:
+            self.cursor.execute(f"""
+                SELECT teams.name, d.workouts, d.minutes, d.calories
+                FROM (
+                    SELECT team_id, SUM(workouts) AS workouts, SUM(minutes) AS minutes, SUM(calories) AS calories
+                    FROM team_daily_totals WHERE day >= ? GROUP BY team_id
+                ) d JOIN teams ON teams.id = d.team_id
+                WHERE d.workouts > 0
+                ORDER BY d.{metric} DESC LIMIT ?""", (_window_start(days), limit))
+        return _ranked(self.cursor.fetchall(), "team")
+
+    def get_team_member_leaderboard(self, team_name, metric="calories", days=None, limit=10):
+        """Ranks the members of one team by calories, minutes or workouts (optionally over `days`)."""
+        if metric not in LEADERBOARD_METRICS:
+            raise ValueError(f"Unknown metric '{metric}', expected one of {LEADERBOARD_METRICS}")
+
+        if days is None:
+            self.cursor.execute(f"""
+                SELECT u.username, COALESCE(w.total_workouts, 0) AS workouts,
+                       COALESCE(w.total_time, 0) AS minutes, COALESCE(w.total_calories, 0) AS calories
+                FROM teams t
+                JOIN team_members m ON m.team_id = t.id
+                JOIN users u ON u.id = m.user_id
+                LEFT JOIN workout_totals w ON w.username = u.username
+                WHERE t.name = ?
+                ORDER BY {metric} DESC LIMIT ?""", (team_name, limit))
+        else:
+            self.cursor.execute(f"""
+                SELECT u.username, COALESCE(SUM(r.workouts), 0) AS workouts,
+                       COALESCE(SUM(r.duration), 0) AS minutes, COALESCE(SUM(r.calories), 0) AS calories
+                FROM teams t
+                JOIN team_members m ON m.team_id = t.id
+                JOIN users u ON u.id = m.user_id
+                LEFT JOIN workout_rollups r ON r.username = u.username AND r.bucket = 'day' AND r.period_start >= ?
+                WHERE t.name = ?
+                GROUP BY u.id
+                ORDER BY {metric} DESC LIMIT ?""", (_window_start(days), team_name, limit))
+        return _ranked(self.cursor.fetchall(), "username")
+
+    def _roll_leaderboard_window(self, days):
+        """Moves a materialized window forward to today, once per day, by recomputing it."""
+        today = date.today().isoformat()
+        self.cursor.execute("SELECT as_of FROM leaderboard_windows WHERE window_days = ?", (days,))
+        row = self.cursor.fetchone()
+        if row and row[0] >= today:
+            return
+
+        self.cursor.execute("BEGIN IMMEDIATE")
+        try:
+            self.cursor.execute("DELETE FROM team_window_totals WHERE window_days = ?", (days,))
+            self.cursor.execute("""
+                INSERT INTO team_window_totals (window_days, team_id, workouts, minutes, calories)
+                SELECT ?, team_id, SUM(workouts), SUM(minutes), SUM(calories)
+                FROM team_daily_totals WHERE day >= ? GROUP BY team_id""", (days, _window_start(days)))
+            self.cursor.execute("INSERT OR REPLACE INTO leaderboard_windows (window_days, as_of) VALUES (?, ?)",
+                                (days, today))
+        except sqlite3.Error:
+            self.cursor.execute("ROLLBACK")
+            raise
+        self.cursor.execute("COMMIT")
+
+    def rebuild_team_leaderboards(self):
+        """Recomputes the daily, all-time and rolling-window team totals from current memberships."""
+        self.cursor.execute("BEGIN IMMEDIATE")
+        try:
+            rebuilt = self._rebuild_team_leaderboards()
+        except sqlite3.Error:
+            self.cursor.execute("ROLLBACK")
+            raise
+        self.cursor.execute("COMMIT")
+        return rebuilt
+
+    def _rebuild_team_leaderboards(self):
+        self.cursor.execute("DELETE FROM team_daily_totals")
+        self.cursor.execute("DELETE FROM team_totals")
+        self.cursor.execute("DELETE FROM team_window_totals")
+        self.cursor.execute("UPDATE leaderboard_windows SET as_of = ?", (date.today().isoformat(),))
+        self.cursor.execute(_TEAM_LEADERBOARD_BACKFILL_DAILY)
+        self.cursor.execute(_TEAM_LEADERBOARD_BACKFILL_TOTALS)
+        rebuilt = self.cursor.rowcount
+        self.cursor.execute(_TEAM_LEADERBOARD_BACKFILL_WINDOWS)
+        return rebuilt
+
+    # ==================== FAVORITES FUNCTIONS ==================== #
+    def get_favorites(self, username):
+        """Returns the user's favorite meals, oldest first."""
+        self.cursor.execute("""
+            SELECT f.meal FROM users u JOIN favorites f ON f.user_id = u.id
+            WHERE u.username = ? ORDER BY f.position""", (username,))
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def save_favorites(self, username, added=(), removed=(), clear=False):
+        """Applies a batch of favorite changes in one transaction: clear, then removals, then additions.
+
+        Added meals go to the end of the list; ones already saved keep their place.
+        """
+        self.cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
+        user = self.cursor.fetchone()
+        if user is None:
+            return False
+
+        self.cursor.execute("BEGIN IMMEDIATE")
+        try:
+            if clear:
+                self.cursor.execute("DELETE FROM favorites WHERE user_id = ?", (user[0],))
+            self.cursor.executemany("DELETE FROM favorites WHERE user_id = ? AND meal = ?",
+                                    ((user[0], meal) for meal in removed))
+            self.cursor.execute("SELECT COALESCE(MAX(position), 0) FROM favorites WHERE user_id = ?", (user[0],))
+            last = self.cursor.fetchone()[0]
+            self.cursor.executemany("INSERT OR IGNORE INTO favorites (user_id, meal, position) VALUES (?, ?, ?)",
+                                    ((user[0], meal, last + offset) for offset, meal in enumerate(added, 1)))
+        except sqlite3.Error:
+            self.cursor.execute("ROLLBACK")
+            raise
+        self.cursor.execute("COMMIT")
+        return True
+
+    # ==================== GENERAL FUNCTIONS ==================== #
+    def reset_workout_summary(self, username):
+        """Deletes all workout data for the given user, effectively resetting their summary."""
+        with self.conn:
+            self.cursor.execute("DELETE FROM workouts WHERE username = ?", (username,))
+        self._publish(WorkoutsReset(username))
+
+    def rebuild_workout_totals(self):
+        """Recomputes workout_totals from the workouts table; returns the number of users rebuilt."""
+        self.cursor.execute("BEGIN IMMEDIATE")
+        try:
+            rebuilt = self._rebuild_workout_totals()
+        except sqlite3.Error:
+            self.cursor.execute("ROLLBACK")
+            raise
+        self.cursor.execute("COMMIT")
+        return rebuilt
+
+    def _rebuild_workout_totals(self):
+        self.cursor.execute("DELETE FROM workout_totals")
+        self.cursor.execute("""
+            INSERT INTO workout_totals (username, total_workouts, total_time, total_calories)
+            SELECT username, COUNT(*), COALESCE(SUM(duration), 0), COALESCE(SUM(calories), 0)
+            FROM workouts GROUP BY username""")
+        return self.cursor.rowcount
+
+    def rebuild_workout_rollups(self):
+        """Recomputes workout_rollups from the workouts table; returns the number of rollup rows."""
+        self.cursor.execute("BEGIN IMMEDIATE")
+        try:
+            rebuilt = self._rebuild_workout_rollups()
+        except sqlite3.Error:
+            self.cursor.execute("ROLLBACK")
+            raise
+        self.cursor.execute("COMMIT")
+        return rebuilt
+
+    def _rebuild_workout_rollups(self):
+        self.cursor.execute("DELETE FROM workout_rollups")
+        self.cursor.execute(f"""
+            INSERT INTO workout_rollups (username, bucket, period_start, workout_type, workouts, duration, calories)
+            {_rollup_backfill()}""")
+        return self.cursor.rowcount
+
+    def verify_workout_totals(self):
+        """Compares workout_totals with a fresh aggregate and returns the mismatching rows.
+
+        Each mismatch is a dict with the username and the stored and expected
+        (workouts, time, calories) tuples; an empty list means the totals are consistent.
+        """
+        self.cursor.execute("""
+            WITH expected AS (
+                SELECT username, COUNT(*) AS workouts, SUM(duration) AS time, SUM(calories) AS calories
+                FROM workouts GROUP BY username
+            )
+            SELECT e.username, t.total_workouts, t.total_time, t.total_calories, e.workouts, e.time, e.calories
+            FROM expected e LEFT JOIN workout_totals t ON t.username = e.username
+            WHERE t.username IS NULL OR t.total_workouts != e.workouts
+               OR t.total_time != e.time OR t.total_calories != e.calories
+            UNION ALL
+            SELECT t.username, t.total_workouts, t.total_time, t.total_calories, 0, 0, 0
+            FROM workout_totals t
+            WHERE (t.total_workouts != 0 OR t.total_time != 0 OR t.total_calories != 0)
+              AND NOT EXISTS (SELECT 1 FROM workouts w WHERE w.username = t.username)
+        """)
+        return [
+            {"username": row[0], "stored": (row[1] or 0, row[2] or 0, row[3] or 0), "expected": row[4:7]}
+            for row in self.cursor.fetchall()
+        ]
+
+    def close(self):
+        """Closes the database connection, or just the cursor if the connection is borrowed."""
+        self.cursor.close()
+        if self._owns_conn:
+            self.conn.close()
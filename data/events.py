@@ -0,0 +1,99 @@
+"""Typed change events published by Database after each committed write.
+
+Subscribers register for an event class, or a base class such as TeamEvent or Event to
+receive a whole family, and are called on the writing thread right after the commit.
+UI code hands events over to the Kivy thread itself (see AsyncDatabaseMixin.subscribe).
+"""
+import threading
+import traceback
+from dataclasses import dataclass
+from typing import ClassVar, Optional
+
+
+@dataclass(frozen=True)
+class Event:
+    """Base class. `username` is the affected user, or None when a write may affect several."""
+
+    change: ClassVar[str] = ""  # Coarse kind of data touched: "workouts", "team" or "profile"
+    username: Optional[str]
+
+
+@dataclass(frozen=True)
+class WorkoutAdded(Event):
+    change: ClassVar[str] = "workouts"
+    workout: dict  # id, workout_type, duration, calories and date, as in get_workout_history_page
+
+
+@dataclass(frozen=True)
+class WorkoutsImported(Event):
+    change: ClassVar[str] = "workouts"
+    count: int
+
+
+@dataclass(frozen=True)
+class WorkoutsReset(Event):
+    change: ClassVar[str] = "workouts"
+
+
+@dataclass(frozen=True)
+class TeamEvent(Event):
+    change: ClassVar[str] = "team"
+    team: str
+
+
+@dataclass(frozen=True)
+class TeamJoined(TeamEvent):
+    admin: bool = False  # True when the user created the team
+
+
+@dataclass(frozen=True)
+class TeamLeft(TeamEvent):
+    removed_by: Optional[str] = None  # The admin, when the user was removed
+
+
+@dataclass(frozen=True)
+class TeamDeleted(TeamEvent):
+    pass
+
+
+@dataclass(frozen=True)
+class MeasurementsUpdated(Event):
+    change: ClassVar[str] = "profile"
+    weight: float
+    height: float
+    body_fat: float
+    bmi: float
+
+
+class EventBus:
+    """Thread-safe publish/subscribe keyed by event class.
+
+    A handler that raises is reported and skipped; the write that published the event has
+    already been committed, so the other subscribers still run.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._handlers = {}  # event class -> tuple of handlers, replaced (never mutated) on change
+
+    def subscribe(self, event_type, handler):
+        """Calls handler(event) for every published `event_type` (or subclass) event."""
+        with self._lock:
+            self._handlers[event_type] = self._handlers.get(event_type, ()) + (handler,)
+
+    def unsubscribe(self, event_type, handler):
+        with self._lock:
+            handlers = tuple(other for other in self._handlers.get(event_type, ()) if other != handler)
+            if handlers:
+                self._handlers[event_type] = handlers
+            else:
+                self._handlers.pop(event_type, None)
+
+    def publish(self, event):
+        handlers = self._handlers
+        for event_type in type(event).__mro__:
+            for handler in handlers.get(event_type, ()):
+                try:
+                    handler(event)
+                except Exception:
+                    print(f"Event handler {handler!r} failed for {event!r}:\n{traceback.format_exc()}")
@@ -0,0 +1,66 @@
+"""Streaming workout export to CSV or JSONL, optionally gzip-compressed.
+
+Rows come from Database.iter_workouts in fetchmany batches and are written as they
+arrive, so exporting a heavy user or the whole table runs in constant memory. The
+output uses the same columns importer.py reads, and every row carries the dedupe key the
+importer would derive for it, so re-importing an export adds nothing already stored.
+"""
+import csv
+import gzip
+import json
+import sys
+
+from .importer import FORMATS, dedupe_key, detect_format
+
+FIELDS = ("username", "workout_type", "duration", "calories", "date", "dedupe_key")
+
+
+def open_output(path):
+    """Opens `path` for writing text, gzip-compressing when it ends in .gz; "-" is stdout."""
+    if path == "-":
+        return sys.stdout
+    if path.endswith(".gz"):
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def with_dedupe_key(workouts):
+    """Fills in the importer's derived key for rows stored without one."""
+    for workout in workouts:
+        if not workout.get("dedupe_key"):
+            workout = {**workout, "dedupe_key": dedupe_key(workout["username"], workout)}
+        yield workout
+
+
+def write_workouts(workouts, handle, fmt):
+    """Writes workout dicts to an open text handle and returns how many were written."""
+    count = 0
+    workouts = with_dedupe_key(workouts)
+    if fmt == "csv":
+        writer = csv.DictWriter(handle, fieldnames=FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for workout in workouts:
+            writer.writerow(workout)
+            count += 1
+    elif fmt == "jsonl":
+        for workout in workouts:
+            handle.write(json.dumps({field: workout[field] for field in FIELDS}))
+            handle.write("\n")
+            count += 1
+    else:
+        raise ValueError(f"Unknown format '{fmt}', expected one of {FORMATS}")
+    return count
+
+
+def export_workouts(db, path, username=None, fmt=None, batch_size=1000):
+    """Exports one user's workouts, or every workout, to `path`; returns the row count.
+
+    The format defaults to the file extension, or CSV when writing to stdout.
+    """
+    fmt = fmt or ("csv" if path == "-" else detect_format(path))
+    handle = open_output(path)
+    try:
+        return write_workouts(db.iter_workouts(username, batch_size), handle, fmt)
+    finally:
+        if handle is not sys.stdout:
+            handle.close()
@@ -0,0 +1,105 @@
+"""Streaming workout importer for CSV and JSONL exports from wearables or older trackers.
+
+Files are read lazily and written in fixed-size chunks through Database.add_workouts_bulk,
+so memory stays bounded by the chunk size whatever the file length. Every row gets a
+dedupe key, which makes importing the same file again (or an export of the same
+database) a no-op for rows that are already stored.
+"""
+import csv
+import gzip
+import hashlib
+import json
+from datetime import datetime
+from itertools import islice
+
+FORMATS = ("csv", "jsonl")
+
+
+def detect_format(path):
+    """Guesses the file format from its extension (a trailing .gz is ignored)."""
+    name = path[:-3] if path.endswith(".gz") else path
+    for fmt in FORMATS:
+        if name.endswith("." + fmt):
+            return fmt
+    if name.endswith(".ndjson") or name.endswith(".json"):
+        return "jsonl"
+    raise ValueError(f"Cannot detect format of '{path}', expected one of {FORMATS}")
+
+
+def open_text(path):
+    """Opens a text file for reading, transparently decompressing .gz files."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def read_rows(path, fmt=None):
+    """Yields one dict per workout record in the file."""
+    fmt = fmt or detect_format(path)
+    with open_text(path) as handle:
+        if fmt == "csv":
+            yield from csv.DictReader(handle)
+        elif fmt == "jsonl":
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ValueError(f"Unknown format '{fmt}', expected one of {FORMATS}")
+
+
+def dedupe_key(username, row):
+    """Returns the row's own dedupe key, or a stable digest of its identifying fields."""
+    if row.get("dedupe_key"):
+        return str(row["dedupe_key"])
+    fields = (username, row["date"], row["workout_type"], row["duration"], row["calories"])
+    return hashlib.blake2b("|".join(str(field) for field in fields).encode(), digest_size=16).hexdigest()
+
+
+def normalize_row(row, username=None):
+    """Converts a raw record into the dict add_workouts_bulk expects, or None if it is unusable."""
+    try:
+        user = username or row["username"]
+        workout = {
+            "username": user,
+            "workout_type": row["workout_type"],
+            "duration": int(float(row["duration"])),
+            "calories": int(float(row["calories"])),
+            "date": datetime.fromisoformat(str(row["date"]).strip()),
+        }
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not user or not workout["workout_type"]:
+        return None
+    workout["dedupe_key"] = dedupe_key(user, {**row, **workout, "date": workout["date"].isoformat(" ")})
+    return workout
+
+
+def import_workouts(db, path, username=None, fmt=None, chunk_size=5000, progress=None):
+    """Streams workouts from `path` into the database in chunks.
+
+    With `username` every row is stored for that user, otherwise each row must have a
+    username column. `progress(stats)` is called after each chunk. Returns a dict with the
+    number of rows read, inserted, skipped as duplicates and rejected as malformed.
+
+    The whole file is one Database.bulk_load(): the aggregates are rebuilt once at the end
+    instead of by triggers on every row, and an interrupted import stores nothing.
+    """
+    stats = {"read": 0, "inserted": 0, "duplicates": 0, "rejected": 0}
+    rows = read_rows(path, fmt)
+
+    with db.bulk_load():
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            workouts = [workout for workout in (normalize_row(row, username) for row in chunk) if workout]
+            inserted = db.add_workouts_bulk(None, workouts) if workouts else 0
+
+            stats["read"] += len(chunk)
+            stats["rejected"] += len(chunk) - len(workouts)
+            stats["inserted"] += inserted
+            stats["duplicates"] = stats["read"] - stats["inserted"] - stats["rejected"]
+            if progress:
+                progress(dict(stats))
+
+    return stats
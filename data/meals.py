@@ -0,0 +1,257 @@
+"""Meal catalog: compact on-disk format, (goal, slot, tag) index and goal-based scoring.
+
+A catalog file holds one record per dish in column order: float32 calories, protein,
+carbs and fat, a uint32 dietary-tag bitmask, a uint8 slot code and a uint8 goal bitmask,
+followed by the tag names and the dish names as newline-separated UTF-8. Loading is a
+handful of buffer copies (or zero-copy views with NumPy), so catalogs of hundreds of
+thousands of dishes open in milliseconds.
+
+Candidates for a (goal, slot, tags) combination are computed once and cached. Scoring
+compares every candidate's calories and macros with the user's per-slot targets;
+it is vectorized with NumPy when installed and falls back to plain Python otherwise.
+
+Build a catalog file from CSV with: python -m data.meals SOURCE.csv OUTPUT.bin
+"""
+import csv
+import heapq
+import os
+import random
+import struct
+import sys
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # Optional: scoring falls back to pure Python
+    np = None
+
+GOALS = ("Muscle Gain", "Weight Loss", "Maintenance")
+SLOTS = ("Breakfast", "Lunch", "Dinner", "Snacks")
+MEAL_CATALOG_PATH = "meals.bin"  # Loaded instead of the built-in seed dishes when present
+
+_MAGIC = b"MEALCAT1"
+_HEADER = struct.Struct("<8sIII")  # magic, dish count, tag-name bytes, dish-name bytes
+
+# Share of the day's calories and macros each slot should cover.
+SLOT_SHARES = {"Breakfast": 0.25, "Lunch": 0.35, "Dinner": 0.30, "Snacks": 0.10}
+# Per goal: daily kcal per kg of body weight, protein g per kg, share of calories from fat.
+GOAL_PROFILES = {
+    "Muscle Gain": (38, 2.0, 0.25),
+    "Weight Loss": (26, 2.2, 0.25),
+    "Maintenance": (32, 1.6, 0.30),
+}
+DEFAULT_WEIGHT_KG = 70
+CALORIE_WEIGHT = 2.0  # Missing the calorie target counts double compared with one macro
+SUGGESTION_POOL = 5  # Suggestions are drawn from this many best-scoring dishes for variety
+
+# (name, slot, goals, calories, protein g, carbs g, fat g, tags) for the built-in catalog.
+SEED_MEALS = [
+    ("Oats with nuts & banana", "Breakfast", ("Muscle Gain",), 520, 16, 78, 17, ("vegetarian", "vegan")),
+    ("Paneer paratha with curd", "Breakfast", ("Muscle Gain",), 610, 24, 62, 29, ("vegetarian",)),
+    ("Egg bhurji with roti", "Breakfast", ("Muscle Gain",), 480, 26, 44, 21, ()),
+    ("Grilled chicken with brown rice", "Lunch", ("Muscle Gain",), 720, 52, 80, 16, ("gluten_free", "dairy_free")),
+    ("Dal, roti & mixed veggies", "Lunch", ("Muscle Gain",), 640, 26, 98, 15, ("vegetarian", "vegan")),
+    ("Rajma chawal", "Lunch", ("Muscle Gain",), 680, 24, 118, 11, ("vegetarian", "vegan", "gluten_free")),
+    ("Fish curry with quinoa", "Dinner", ("Muscle Gain",), 640, 46, 58, 22, ("gluten_free", "dairy_free")),
+    ("Soybean curry with rice", "Dinner", ("Muscle Gain",), 660, 38, 84, 17, ("vegetarian", "vegan", "gluten_free")),
+    ("Grilled tofu with veggies", "Dinner", ("Muscle Gain",), 520, 34, 36, 24, ("vegetarian", "vegan", "gluten_free")),
+    ("Protein shake", "Snacks", ("Muscle Gain",), 260, 32, 18, 6, ("vegetarian", "gluten_free")),
+    ("Greek yogurt with fruits", "Snacks", ("Muscle Gain",), 240, 18, 30, 5, ("vegetarian", "gluten_free")),
+    ("Handful of almonds & walnuts", "Snacks", ("Muscle Gain",), 300, 9, 9, 27, ("vegetarian", "vegan", "gluten_free")),
+    ("Moong dal chilla", "Breakfast", ("Weight Loss",), 290, 17, 38, 7, ("vegetarian", "vegan", "gluten_free")),
+    ("Fruit smoothie", "Breakfast", ("Weight Loss",), 230, 6, 46, 3, ("vegetarian", "gluten_free")),
+    ("Boiled eggs with green tea", "Breakfast", ("Weight Loss",), 160, 13, 2, 11, ("gluten_free", "dairy_free")),
+    ("Grilled salmon with salad", "Lunch", ("Weight Loss",), 430, 36, 12, 26, ("gluten_free", "dairy_free")),
+    ("Khichdi with curd", "Lunch", ("Weight Loss",), 410, 16, 66, 9, ("vegetarian", "gluten_free")),
+    ("Multigrain roti & sabzi", "Lunch", ("Weight Loss",), 380, 12, 58, 11, ("vegetarian", "vegan")),
+    ("Lentil soup with whole wheat toast", "Dinner", ("Weight Loss",), 360, 19, 56, 6, ("vegetarian", "vegan")),
+    ("Chicken soup", "Dinner", ("Weight Loss",), 280, 28, 16, 10, ("gluten_free", "dairy_free")),
+    ("Vegetable stir fry", "Dinner", ("Weight Loss",), 260, 9, 30, 11, ("vegetarian", "vegan", "gluten_free")),
+    ("Sprouts salad", "Snacks", ("Weight Loss",), 150, 10, 24, 2, ("vegetarian", "vegan", "gluten_free")),
+    ("Fox nuts (Makhana)", "Snacks", ("Weight Loss",), 120, 4, 22, 1, ("vegetarian", "vegan", "gluten_free")),
+    ("Cucumber & carrot sticks", "Snacks", ("Weight Loss",), 60, 2, 13, 0, ("vegetarian", "vegan", "gluten_free")),
+    ("Poha with peanuts", "Breakfast", ("Maintenance",), 380, 10, 58, 12, ("vegetarian", "vegan", "gluten_free")),
+    ("Ragi dosa", "Breakfast", ("Maintenance",), 340, 9, 56, 9, ("vegetarian", "vegan", "gluten_free")),
+    ("Scrambled eggs with toast", "Breakfast", ("Maintenance",), 420, 22, 32, 22, ()),
+    ("Vegetable biryani", "Lunch", ("Maintenance",), 620, 14, 96, 19, ("vegetarian", "gluten_free")),
+    ("Dal, rice & sabzi", "Lunch", ("Maintenance",), 580, 20, 98, 11, ("vegetarian", "vegan", "gluten_free")),
+    ("Grilled fish with sweet potatoes", "Lunch", ("Maintenance",), 560, 40, 52, 19, ("gluten_free", "dairy_free")),
+    ("Mixed vegetable soup", "Dinner", ("Maintenance",), 240, 7, 38, 6, ("vegetarian", "vegan", "gluten_free")),
+    ("Grilled paneer with salad", "Dinner", ("Maintenance",), 480, 28, 14, 34, ("vegetarian", "gluten_free")),
+    ("Stuffed chapati rolls", "Dinner", ("Maintenance",), 520, 18, 70, 18, ("vegetarian",)),
+    ("Roasted chana", "Snacks", ("Maintenance",), 190, 10, 30, 3, ("vegetarian", "vegan", "gluten_free")),
+    ("Fruit salad", "Snacks", ("Maintenance",), 150, 2, 36, 1, ("vegetarian", "vegan", "gluten_free")),
+    ("Homemade protein bars", "Snacks", ("Maintenance",), 250, 15, 26, 10, ("vegetarian",)),
+]
+
+
+def daily_targets(goal, weight_kg=None):
+    """Daily calories and protein/carbs/fat grams for a goal, scaled by body weight."""
+    kcal_per_kg, protein_per_kg, fat_share = GOAL_PROFILES[goal]
+    weight = weight_kg or DEFAULT_WEIGHT_KG
+    calories = kcal_per_kg * weight
+    protein = protein_per_kg * weight
+    fat = calories * fat_share / 9
+    carbs = max(calories - protein * 4 - fat * 9, 0) / 4
+    return {"calories": calories, "protein": protein, "carbs": carbs, "fat": fat}
+
+
+def slot_targets(goal, slot, weight_kg=None):
+    """The share of daily_targets() one meal slot should cover."""
+    share = SLOT_SHARES[slot]
+    return {key: value * share for key, value in daily_targets(goal, weight_kg).items()}
+
+
+class MealCatalog:
+    """Column-oriented dish table with cached (goal, slot, tags) candidate lists."""
+
+    def __init__(self, names, calories, protein, carbs, fat, slots, goals, tags, tag_names):
+        self.names = names
+        self.tag_names = tuple(tag_names)
+        self._tag_bits = {name: 1 << index for index, name in enumerate(self.tag_names)}
+        if np is not None:
+            as_array = np.asarray
+            self.calories, self.protein = as_array(calories, np.float32), as_array(protein, np.float32)
+            self.carbs, self.fat = as_array(carbs, np.float32), as_array(fat, np.float32)
+            self.slots, self.goals = as_array(slots, np.uint8), as_array(goals, np.uint8)
+            self.tags = as_array(tags, np.uint32)
+        else:
+            self.calories, self.protein, self.carbs, self.fat = calories, protein, carbs, fat
+            self.slots, self.goals, self.tags = slots, goals, tags
+        self._candidates = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_dishes(cls, dishes):
+        """Builds a catalog from (name, slot, goals, calories, protein, carbs, fat, tags) tuples."""
+        tag_names = sorted({tag for dish in dishes for tag in dish[7]})
+        tag_bits = {name: 1 << index for index, name in enumerate(tag_names)}
+        columns = [[], array("f"), array("f"), array("f"), array("f"), array("B"), array("B"), array("I")]
+        for name, slot, goals, calories, protein, carbs, fat, tags in dishes:
+            values = (name, calories, protein, carbs, fat, SLOTS.index(slot),
+                      sum(1 << GOALS.index(goal) for goal in goals), sum(tag_bits[tag] for tag in tags))
+            for column, value in zip(columns, values):
+                column.append(value)
+        return cls(*columns, tag_names)
+
+    @classmethod
+    def load(cls, path):
+        """Reads a catalog written by save()."""
+        with open(path, "rb") as handle:
+            data = handle.read()
+        magic, count, tag_bytes, name_bytes = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError(f"'{path}' is not a meal catalog")
+        offset = _HEADER.size
+        columns = []
+        for typecode in ("f", "f", "f", "f", "I", "B", "B"):
+            size = count * array(typecode).itemsize
+            if np is not None:
+                column = np.frombuffer(data, {"f": np.float32, "I": np.uint32, "B": np.uint8}[typecode], count, offset)
+            else:
+                column = array(typecode, data[offset:offset + size])
+            columns.append(column)
+            offset += size
+        tag_names = data[offset:offset + tag_bytes].decode("utf-8").split("\n") if tag_bytes else []
+        offset += tag_bytes
+        names = data[offset:offset + name_bytes].decode("utf-8").split("\n") if count else []
+        calories, protein, carbs, fat, tags, slots, goals = columns
+        return cls(names, calories, protein, carbs, fat, slots, goals, tags, tag_names)
+
+    def save(self, path):
+        """Writes the catalog in the compact column format (see the module docstring)."""
+        tag_blob = "\n".join(self.tag_names).encode("utf-8")
+        name_blob = "\n".join(self.names).encode("utf-8")
+        with open(path, "wb") as handle:
+            handle.write(_HEADER.pack(_MAGIC, len(self), len(tag_blob), len(name_blob)))
+            for column, typecode in ((self.calories, "f"), (self.protein, "f"), (self.carbs, "f"),
+                                     (self.fat, "f"), (self.tags, "I"), (self.slots, "B"), (self.goals, "B")):
+                handle.write(array(typecode, column).tobytes() if np is None else np.asarray(column).tobytes())
+            handle.write(tag_blob)
+            handle.write(name_blob)
+
+    def tag_mask(self, tags):
+        """Bitmask for dietary tags; unknown tags match no dish."""
+        mask = 0
+        for tag in tags:
+            if tag not in self._tag_bits:
+                return None
+            mask |= self._tag_bits[tag]
+        return mask
+
+    def candidates(self, goal, slot, tags=()):
+        """Indices of dishes for a goal and slot carrying every tag in `tags` (cached)."""
+        key = (goal, slot, frozenset(tags))
+        found = self._candidates.get(key)
+        if found is None:
+            goal_bit, slot_code, mask = 1 << GOALS.index(goal), SLOTS.index(slot), self.tag_mask(tags)
+            if mask is None:
+                found = [] if np is None else np.empty(0, np.intp)
+            elif np is not None:
+                found = np.flatnonzero((self.slots == slot_code) & ((self.goals & goal_bit) != 0)
+                                       & ((self.tags & mask) == mask))
+            else:
+                found = [index for index in range(len(self.names))
+                         if self.slots[index] == slot_code and self.goals[index] & goal_bit
+                         and self.tags[index] & mask == mask]
+            self._candidates[key] = found
+        return found
+
+    def score(self, indices, targets):
+        """Distance of each candidate from `targets` (lower is better): relative squared errors."""
+        calories, protein = targets["calories"], targets["protein"]
+        carbs, fat = targets["carbs"] or 1, targets["fat"] or 1
+        if np is not None:
+            return (CALORIE_WEIGHT * ((self.calories[indices] - calories) / calories) ** 2
+                    + ((self.protein[indices] - protein) / protein) ** 2
+                    + ((self.carbs[indices] - carbs) / carbs) ** 2
+                    + ((self.fat[indices] - fat) / fat) ** 2)
+        return [CALORIE_WEIGHT * ((self.calories[i] - calories) / calories) ** 2
+                + ((self.protein[i] - protein) / protein) ** 2
+                + ((self.carbs[i] - carbs) / carbs) ** 2
+                + ((self.fat[i] - fat) / fat) ** 2 for i in indices]
+
+    def best(self, goal, slot, targets, tags=(), limit=SUGGESTION_POOL):
+        """Names of the `limit` dishes closest to `targets`, best first."""
+        indices = self.candidates(goal, slot, tags)
+        if len(indices) == 0:
+            return []
+        scores = self.score(indices, targets)
+        if np is not None:
+            top = np.argpartition(scores, limit - 1)[:limit] if len(indices) > limit else np.arange(len(indices))
+            top = top[np.argsort(scores[top])]
+            return [self.names[indices[i]] for i in top]
+        top = heapq.nsmallest(limit, range(len(indices)), key=scores.__getitem__)
+        return [self.names[indices[i]] for i in top]
+
+    def suggest(self, goal, slot, targets, tags=(), rng=random):
+        """One of the best-scoring dishes at random (so "Refresh" varies), or None."""
+        best = self.best(goal, slot, targets, tags)
+        return rng.choice(best) if best else None
+
+
+def load_catalog(path=MEAL_CATALOG_PATH):
+    """The catalog at `path` if it exists, otherwise the built-in seed dishes."""
+    if path and os.path.exists(path):
+        return MealCatalog.load(path)
+    return MealCatalog.from_dishes(SEED_MEALS)
+
+
+def read_csv(path):
+    """Yields dish tuples from a CSV with name, slot, goals, calories, protein, carbs, fat, tags
+    columns; goals and tags are ";"-separated."""
+    with open(path, encoding="utf-8", newline="") as handle:
+        for row in csv.DictReader(handle):
+            yield (row["name"].replace("\n", " "), row["slot"], tuple(filter(None, row["goals"].split(";"))),
+                   float(row["calories"]), float(row["protein"]), float(row["carbs"]), float(row["fat"]),
+                   tuple(filter(None, row.get("tags", "").split(";"))))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m data.meals SOURCE.csv OUTPUT.bin")
+    catalog = MealCatalog.from_dishes(list(read_csv(sys.argv[1])))
+    catalog.save(sys.argv[2])
+    print(f"Wrote {len(catalog)} dishes to {sys.argv[2]}")
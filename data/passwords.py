@@ -0,0 +1,166 @@
+"""Salted, cost-tunable password hashing.
+
+Hashes are stored as "$"-separated strings that name their algorithm and cost, so any
+registered hasher can verify them and stale ones can be upgraded on the next login.
+Legacy rows hold a bare unsalted SHA-256 hex digest; they still verify but always report
+needs_rehash(). hashlib releases the GIL while deriving keys, so running verification on
+a worker thread keeps the Kivy main thread free.
+"""
+import base64
+import hashlib
+import hmac
+import math
+import os
+import time
+
+# Stored hashes are upgraded only once they fall below this fraction of the current cost, so
+# run-to-run noise in calibrate() does not make logins pay for a second hash.
+REHASH_BELOW = 0.8
+
+
+def _b64encode(data):
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _b64decode(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+class PBKDF2Hasher:
+    """PBKDF2-HMAC-SHA256 with a per-password salt; cost is the iteration count."""
+
+    algorithm = "pbkdf2_sha256"
+    min_cost = 100_000
+    max_cost = 5_000_000
+
+    def __init__(self, cost=600_000):
+        self.cost = cost
+
+    def hash(self, password, salt=None):
+        salt = salt or os.urandom(16)
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, self.cost)
+        return f"{self.algorithm}${self.cost}${_b64encode(salt)}${_b64encode(digest)}"
+
+    def verify(self, password, stored):
+        _, cost, salt, expected = stored.split("$")
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode(), _b64decode(salt), int(cost))
+        return hmac.compare_digest(digest, _b64decode(expected))
+
+    def stored_cost(self, stored):
+        return int(stored.split("$")[1])
+
+    def time_cost(self, cost):
+        """Seconds one hash takes at `cost` on this machine."""
+        started = time.perf_counter()
+        hashlib.pbkdf2_hmac("sha256", b"calibration", b"calibration-salt", cost)
+        return time.perf_counter() - started
+
+    def scale_cost(self, cost, factor):
+        # Coarse steps keep repeated calibrations on one device landing on the same cost.
+        return round(cost * factor / 50_000) * 50_000
+
+
+class ScryptHasher:
+    """scrypt with r=8, p=1; cost is the CPU/memory parameter N (a power of two)."""
+
+    algorithm = "scrypt"
+    min_cost = 2 ** 14
+    max_cost = 2 ** 20
+    block_size = 8
+
+    def __init__(self, cost=2 ** 15):
+        self.cost = cost
+
+    def _derive(self, password, salt, cost):
+        # scrypt needs about 128 * N * r bytes; leave headroom over hashlib's 32 MiB default.
+        return hashlib.scrypt(password.encode(), salt=salt, n=cost, r=self.block_size, p=1,
+                              maxmem=256 * cost * self.block_size, dklen=32)
+
+    def hash(self, password, salt=None):
+        salt = salt or os.urandom(16)
+        digest = self._derive(password, salt, self.cost)
+        return f"{self.algorithm}${self.cost}${_b64encode(salt)}${_b64encode(digest)}"
+
+    def verify(self, password, stored):
+        _, cost, salt, expected = stored.split("$")
+        return hmac.compare_digest(self._derive(password, _b64decode(salt), int(cost)), _b64decode(expected))
+
+    def stored_cost(self, stored):
+        return int(stored.split("$")[1])
+
+    def time_cost(self, cost):
+        started = time.perf_counter()
+        self._derive("calibration", b"calibration-salt", cost)
+        return time.perf_counter() - started
+
+    def scale_cost(self, cost, factor):
+        # Round to the nearest power of two; scrypt only accepts those.
+        return 2 ** round(math.log2(cost * factor))
+
+
+HASHERS = {hasher.algorithm: hasher for hasher in (PBKDF2Hasher, ScryptHasher)}
+
+_default_hasher = PBKDF2Hasher()
+
+
+def get_hasher():
+    """Returns the hasher used for new passwords."""
+    return _default_hasher
+
+
+def set_hasher(hasher):
+    """Replaces the hasher used for new passwords (existing hashes keep verifying)."""
+    global _default_hasher
+    _default_hasher = hasher
+
+
+def is_legacy(stored):
+    """True for the old unsalted SHA-256 hex digests."""
+    return "$" not in stored
+
+
+def hash_password(password):
+    """Hashes a new password with the current hasher."""
+    return _default_hasher.hash(password)
+
+
+def verify_password(password, stored):
+    """Checks a password against any supported stored hash, legacy SHA-256 included."""
+    if not stored:
+        return False
+    if is_legacy(stored):
+        return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored)
+    hasher_class = HASHERS.get(stored.split("$", 1)[0])
+    if hasher_class is None:
+        return False
+    hasher = _default_hasher if isinstance(_default_hasher, hasher_class) else hasher_class()
+    try:
+        return hasher.verify(password, stored)
+    except (ValueError, TypeError):
+        return False  # Malformed stored hash
+
+
+def needs_rehash(stored):
+    """True if `stored` is legacy, uses another algorithm, or is well below the current cost."""
+    if is_legacy(stored) or not stored.startswith(_default_hasher.algorithm + "$"):
+        return True
+    return _default_hasher.stored_cost(stored) < REHASH_BELOW * _default_hasher.cost
+
+
+def calibrate(target_seconds=0.25, hasher=None):
+    """Tunes the hasher's cost so one hash takes about `target_seconds` here; returns the cost.
+
+    The cost is clamped to the hasher's [min_cost, max_cost] so slow devices never drop
+    below a safe floor. Meant to run once at startup, off the UI thread.
+    """
+    hasher = hasher or _default_hasher
+    cost = hasher.min_cost
+    elapsed = hasher.time_cost(cost)
+    # Scale up from the floor in a couple of steps; one sample is noisy on a cold start.
+    for _ in range(3):
+        if elapsed <= 0 or abs(elapsed - target_seconds) / target_seconds < 0.2:
+            break
+        cost = min(hasher.max_cost, max(hasher.min_cost, hasher.scale_cost(cost, target_seconds / elapsed)))
+        elapsed = hasher.time_cost(cost)
+    hasher.cost = cost
+    return cost
@@ -0,0 +1,283 @@
+"""Opt-in statement tracing for the SQLite layer.
+
+A traced connection hands out TracingCursors, which time every execute/executemany and
+record per-statement latency histograms, row counts and the Database method that issued
+them. Statements slower than a threshold are logged, and with plan capture on each
+distinct statement is run once through EXPLAIN QUERY PLAN so full scans and temp B-tree
+sorts are flagged.
+
+Enable it for the app with FITNESS_QUERY_TRACE=1 (or =plans to also capture plans);
+FITNESS_SLOW_QUERY_MS sets the slow-query threshold. Query the stats at runtime with
+QueryTracer.snapshot()/report() or save them with export().
+"""
+import bisect
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+QUERY_TRACE_ENV = "FITNESS_QUERY_TRACE"
+SLOW_QUERY_ENV = "FITNESS_SLOW_QUERY_MS"
+DEFAULT_SLOW_QUERY_MS = 100
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended.
+HISTOGRAM_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+PLAN_STATEMENTS = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE")
+SLOW_LOG_SIZE = 200
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(sql):
+    """Collapses whitespace so the same statement from different call sites shares one entry."""
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def plan_warnings(plan):
+    """Returns the EXPLAIN QUERY PLAN details that point at a full scan or a temp B-tree."""
+    warnings = []
+    for detail in plan:
+        # "SCAN t" is a full table scan; "SCAN t USING [COVERING] INDEX i" walks an index.
+        if detail.startswith("SCAN ") and " USING " not in detail and "CONSTANT ROW" not in detail:
+            warnings.append(detail)
+        elif "USE TEMP B-TREE" in detail:
+            warnings.append(detail)
+    return warnings
+
+
+class StatementStats:
+    """Running totals for one normalized statement."""
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.fetch_total = 0.0
+        self.rows = 0
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        self.call_sites = Counter()
+        self.plan = None
+        self.plan_warnings = []
+
+    def add(self, seconds, rows, call_site):
+        self.calls += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.rows += rows
+        self.histogram[bisect.bisect_left(HISTOGRAM_BOUNDS_MS, seconds * 1000)] += 1
+        self.call_sites[call_site] += 1
+
+    def percentile_ms(self, fraction):
+        """Upper bound of the histogram bucket holding the given percentile."""
+        target = fraction * self.calls
+        seen = 0
+        for index, count in enumerate(self.histogram):
+            seen += count
+            if count and seen >= target:
+                return HISTOGRAM_BOUNDS_MS[index] if index < len(HISTOGRAM_BOUNDS_MS) else round(self.max * 1000, 3)
+        return 0.0
+
+    def as_dict(self):
+        return {
+            "sql": self.sql,
+            "calls": self.calls,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total / self.calls * 1000, 4) if self.calls else 0.0,
+            "p50_ms_le": self.percentile_ms(0.50),
+            "p95_ms_le": self.percentile_ms(0.95),
+            "p99_ms_le": self.percentile_ms(0.99),
+            "max_ms": round(self.max * 1000, 3),
+            "fetch_ms": round(self.fetch_total * 1000, 3),
+            "rows": self.rows,
+            "histogram": dict(zip([f"<={bound}ms" for bound in HISTOGRAM_BOUNDS_MS] + ["slower"], self.histogram)),
+            "call_sites": dict(self.call_sites.most_common()),
+            "plan": self.plan,
+            "plan_warnings": self.plan_warnings,
+        }
+
+
+class QueryTracer:
+    """Collects statement statistics from every traced connection; safe to share across threads."""
+
+    def __init__(self, slow_ms=DEFAULT_SLOW_QUERY_MS, capture_plans=False, log=print):
+        self.slow_ms = slow_ms
+        self.capture_plans = capture_plans
+        self.log = log
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._slow = deque(maxlen=SLOW_LOG_SIZE)
+
+    @classmethod
+    def from_env(cls):
+        """A tracer configured from FITNESS_QUERY_TRACE / FITNESS_SLOW_QUERY_MS, or None if tracing is off."""
+        mode = os.environ.get(QUERY_TRACE_ENV, "").lower()
+        if mode in ("", "0", "false", "no"):
+            return None
+        slow_ms = float(os.environ.get(SLOW_QUERY_ENV, DEFAULT_SLOW_QUERY_MS))
+        return cls(slow_ms=slow_ms, capture_plans=mode == "plans")
+
+    def connect(self, path, **kwargs):
+        """sqlite3.connect() returning a connection whose cursors report to this tracer."""
+        conn = sqlite3.connect(path, factory=TracingConnection, **kwargs)
+        conn.tracer = self
+        return conn
+
+    def record(self, conn, sql, parameters, seconds, rows, call_site):
+        key = normalize(sql)
+        with self._lock:
+            stats = self._stats.get(key)
+            new = stats is None
+            if new:
+                stats = self._stats[key] = StatementStats(key)
+            stats.add(seconds, rows, call_site)
+        if new and self.capture_plans and parameters is not None:
+            self._explain(conn, stats, sql, parameters)
+        if seconds * 1000 >= self.slow_ms:
+            entry = {"sql": key, "ms": round(seconds * 1000, 3), "rows": rows, "call_site": call_site,
+                     "at": time.strftime("%Y-%m-%d %H:%M:%S")}
+            with self._lock:
+                self._slow.append(entry)
+            self.log(f"Slow query ({entry['ms']} ms) in {call_site}: {key[:200]}")
+
+    def record_fetch(self, sql, seconds, rows):
+        with self._lock:
+            stats = self._stats.get(normalize(sql))
+            if stats is not None:
+                stats.fetch_total += seconds
+                stats.rows += rows
+
+    def _explain(self, conn, stats, sql, parameters):
+        if not normalize(sql).upper().startswith(PLAN_STATEMENTS):
+            return
+        try:
+            # A plain cursor: the EXPLAIN itself must not be traced.
+            cursor = sqlite3.Cursor(conn)
+            plan = [row[3] for row in cursor.execute("EXPLAIN QUERY PLAN " + sql, parameters)]
+            cursor.close()
+        except sqlite3.Error as error:
+            plan = [f"EXPLAIN failed: {error}"]
+        warnings = plan_warnings(plan)
+        with self._lock:
+            stats.plan, stats.plan_warnings = plan, warnings
+        for warning in warnings:
+            self.log(f"Query plan warning ({warning}) in {stats.call_sites.most_common(1)[0][0]}: {stats.sql[:200]}")
+
+    def snapshot(self, order_by="total_ms"):
+        """Per-statement stats as dicts, most expensive first."""
+        with self._lock:
+            rows = [stats.as_dict() for stats in self._stats.values()]
+        return sorted(rows, key=lambda row: row[order_by], reverse=True)
+
+    def slow_queries(self):
+        """The most recent statements over the slow threshold, oldest first."""
+        with self._lock:
+            return list(self._slow)
+
+    def flagged(self):
+        """Statements whose plan has a full scan or temp B-tree."""
+        return [row for row in self.snapshot() if row["plan_warnings"]]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._slow.clear()
+
+    def report(self, limit=20):
+        """A plain-text table of the most expensive statements."""
+        lines = [f"{'calls':>8} {'total ms':>10} {'mean ms':>9} {'p95 ms<=':>9} {'rows':>9}  statement"]
+        for row in self.snapshot()[:limit]:
+            flag = " [!]" if row["plan_warnings"] else ""
+            lines.append(f"{row['calls']:>8} {row['total_ms']:>10.1f} {row['mean_ms']:>9.3f} "
+                         f"{row['p95_ms_le']:>9} {row['rows']:>9}  {row['sql'][:90]}{flag}")
+        return "\n".join(lines)
+
+    def export(self, path):
+        """Writes statements, slow-query log and threshold to `path` as JSON."""
+        document = {"slow_ms": self.slow_ms, "statements": self.snapshot(), "slow_queries": self.slow_queries()}
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(document, handle, indent=2)
+            handle.write("\n")
+        return path
+
+
+_env_tracer = None
+_env_lock = threading.Lock()
+
+
+def env_tracer():
+    """The process-wide tracer configured from the environment (None when tracing is off)."""
+    global _env_tracer
+    with _env_lock:
+        if _env_tracer is None:
+            _env_tracer = QueryTracer.from_env() or False
+    return _env_tracer or None
+
+
+def _call_site():
+    """The first frame outside this module and the sqlite3 package: usually a Database method."""
+    frame = sys._getframe(2)
+    while frame and frame.f_code.co_filename in (__file__, sqlite3.__file__):
+        frame = frame.f_back
+    if frame is None:
+        return "?"
+    return f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno})"
+
+
+class TracingCursor(sqlite3.Cursor):
+    """Cursor that reports execute latency, rows and call site to its connection's tracer."""
+
+    _last_sql = None
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            elapsed = time.perf_counter() - started
+            self._last_sql = sql
+            rows = max(self.rowcount, 0)  # DML row count; SELECT rows are counted as they are fetched
+            self.connection.tracer.record(self.connection, sql, parameters, elapsed, rows, _call_site())
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._last_sql = sql
+            self.connection.tracer.record(self.connection, sql, None, time.perf_counter() - started,
+                                          max(self.rowcount, 0), _call_site())
+
+    def _fetched(self, started, rows):
+        if self._last_sql is not None:
+            self.connection.tracer.record_fetch(self._last_sql, time.perf_counter() - started, rows)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, 1 if row is not None else 0)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows))
+        return rows
+
+
+class TracingConnection(sqlite3.Connection):
+    """Connection whose cursor() defaults to TracingCursor."""
+
+    tracer = None
+
+    def cursor(self, factory=TracingCursor):
+        return super().cursor(factory)
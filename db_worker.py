@@ -0,0 +1,125 @@
+"""Kivy adapter for the data package: runs Database work off the UI thread and reads app state."""
+import queue
+import threading
+import traceback
+from kivy.app import App
+from kivy.clock import Clock
+from instrumentation import tracer
+
+
+def get_logged_in_username():
+    """Returns the running app's logged-in username, or None."""
+    app = App.get_running_app()
+    return getattr(app, "logged_in_user", None)
+
+
+class DatabaseJob:
+    """Handle for a submitted database operation; cancel() drops it if it has not run yet."""
+
+    def __init__(self, fn, on_result=None, on_error=None):
+        self.fn = fn
+        self.on_result = on_result
+        self.on_error = on_error
+        self.cancelled = False
+        self.done = False
+
+    def cancel(self):
+        """Skips the job if still queued and suppresses its callbacks either way."""
+        self.cancelled = True
+
+
+class DatabaseWorker:
+    """Runs Database operations on background threads and delivers results on the Kivy thread.
+
+    Jobs are callables taking a Database borrowed from the app's ConnectionManager, so each
+    worker thread reuses its own connection. Results and errors come back through
+    Clock.schedule_once, which keeps every widget update on the main thread.
+    """
+
+    def __init__(self, manager, workers=1):
+        self.manager = manager
+        self.workers = workers
+        self._queue = queue.Queue()
+        self._threads = []
+
+    def start(self):
+        """Starts the worker threads (idempotent)."""
+        if self._threads:
+            return
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"db-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, fn, on_result=None, on_error=None):
+        """Queues fn(db) and returns its DatabaseJob; callbacks receive the result or exception."""
+        job = DatabaseJob(fn, on_result, on_error)
+        self.start()
+        self._queue.put(job)
+        return job
+
+    def stop(self):
+        """Lets queued jobs finish, then stops the worker threads."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads.clear()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            if job.cancelled:
+                continue
+            try:
+                with self.manager.database() as db, tracer.span(getattr(job.fn, "__qualname__", "job"), "db"):
+                    result = job.fn(db)
+            except Exception as error:
+                traceback.print_exc()
+                self._deliver(job, job.on_error, error)
+            else:
+                self._deliver(job, job.on_result, result)
+
+    def _deliver(self, job, callback, value):
+        def deliver(dt):
+            job.done = True
+            if callback and not job.cancelled:
+                callback(value)
+        Clock.schedule_once(deliver)
+
+
+class AsyncDatabaseMixin:
+    """Screen mixin that runs database work off the UI thread and cancels it on leave."""
+
+    def run_db(self, fn, on_result=None, on_error=None, cancel_on_leave=True, worker=None):
+        """Submits fn(db) to `worker` (the app's db_worker by default); returns the DatabaseJob."""
+        worker = worker or App.get_running_app().db_worker
+        job = worker.submit(fn, on_result, on_error)
+        if cancel_on_leave:
+            pending = [other for other in getattr(self, "_db_jobs", []) if not other.done]
+            self._db_jobs = pending + [job]
+        return job
+
+    def cancel_db_jobs(self):
+        """Cancels every pending job started by this screen."""
+        for job in getattr(self, "_db_jobs", []):
+            job.cancel()
+        self._db_jobs = []
+
+    def on_leave(self, *args):
+        self.cancel_db_jobs()
+        super().on_leave(*args)
+
+    def subscribe(self, event_type, handler):
+        """Calls handler(event) on the Kivy thread for every `event_type` event the app's database publishes.
+
+        Events are published on the worker thread that made the write and handed over with
+        Clock.schedule_once, in publish order. Screens live as long as the app, and so do
+        their subscriptions.
+        """
+        def deliver(event):
+            Clock.schedule_once(lambda dt: handler(event))
+
+        App.get_running_app().db_manager.events.subscribe(event_type, deliver)
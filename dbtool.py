@@ -0,0 +1,128 @@
+"""Command-line maintenance for the fitness database.
+
+Usage:
+    python dbtool.py [--db users.db] [--profile durable|balanced|throughput] [--trace-queries FILE] migrate
+    python dbtool.py [--db users.db] verify-totals
+    python dbtool.py [--db users.db] rebuild-totals
+    python dbtool.py [--db users.db] rebuild-rollups
+    python dbtool.py [--db users.db] rebuild-leaderboards
+    python dbtool.py [--db users.db] import FILE [--user NAME] [--format csv|jsonl] [--chunk-size N]
+    python dbtool.py [--db users.db] export FILE [--user NAME] [--format csv|jsonl] [--batch-size N]
+"""
+import argparse
+import sys
+import time
+
+from data import exporter, importer
+from data.database import DB_PATH, STORAGE_PROFILES, ConnectionManager
+from data.query_trace import QueryTracer
+
+
+def cmd_migrate(db, args):
+    """Applies pending migrations (done on connect) and reports the schema version."""
+    print(f"Schema version: {db.get_schema_version()}")
+    return 0
+
+
+def cmd_verify_totals(db, args):
+    """Reports users whose stored workout totals disagree with their workouts."""
+    mismatches = db.verify_workout_totals()
+    for row in mismatches:
+        print(f"{row['username']}: stored {row['stored']} expected {row['expected']}")
+    print(f"{len(mismatches)} mismatched user(s)")
+    return 1 if mismatches else 0
+
+
+def cmd_rebuild_totals(db, args):
+    """Recomputes workout_totals from scratch."""
+    print(f"Rebuilt totals for {db.rebuild_workout_totals()} user(s)")
+    return 0
+
+
+def cmd_rebuild_rollups(db, args):
+    """Recomputes the daily/weekly/monthly workout rollups from scratch."""
+    print(f"Rebuilt {db.rebuild_workout_rollups()} rollup row(s)")
+    return 0
+
+
+def cmd_rebuild_leaderboards(db, args):
+    """Recomputes the team leaderboard tables from current memberships."""
+    print(f"Rebuilt leaderboard totals for {db.rebuild_team_leaderboards()} team(s)")
+    return 0
+
+
+def cmd_import(db, args):
+    """Streams workouts from a CSV/JSONL file (optionally .gz) into the database."""
+    started = time.perf_counter()
+
+    def progress(stats):
+        print(f"\r{stats['read']} read, {stats['inserted']} inserted, {stats['duplicates']} duplicate, "
+              f"{stats['rejected']} rejected", end="", flush=True)
+
+    stats = importer.import_workouts(db, args.file, username=args.user, fmt=args.format,
+                                     chunk_size=args.chunk_size, progress=progress)
+    print(f"\nImported {stats['inserted']} workout(s) in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+def cmd_export(db, args):
+    """Streams workouts to a CSV/JSONL file; a .gz suffix compresses the output."""
+    started = time.perf_counter()
+    count = exporter.export_workouts(db, args.file, username=args.user, fmt=args.format, batch_size=args.batch_size)
+    print(f"Exported {count} workout(s) in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return 0
+
+
+COMMANDS = {
+    "migrate": cmd_migrate,
+    "verify-totals": cmd_verify_totals,
+    "rebuild-totals": cmd_rebuild_totals,
+    "rebuild-rollups": cmd_rebuild_rollups,
+    "rebuild-leaderboards": cmd_rebuild_leaderboards,
+    "import": cmd_import,
+    "export": cmd_export,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fitness database maintenance")
+    parser.add_argument("--db", default=DB_PATH, help="path to the SQLite database")
+    parser.add_argument("--profile", choices=STORAGE_PROFILES,
+                        help="storage profile (defaults to $FITNESS_DB_PROFILE, then settings.json)")
+    parser.add_argument("--trace-queries", metavar="FILE",
+                        help="trace every statement (with query plans) and save the stats to FILE as JSON")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name in ("migrate", "verify-totals", "rebuild-totals", "rebuild-rollups", "rebuild-leaderboards"):
+        subparsers.add_parser(name)
+    import_parser = subparsers.add_parser("import")
+    import_parser.add_argument("file")
+    import_parser.add_argument("--user", help="store every row for this user instead of the file's username column")
+    import_parser.add_argument("--format", choices=importer.FORMATS, help="defaults to the file extension")
+    import_parser.add_argument("--chunk-size", type=int, default=5000)
+    export_parser = subparsers.add_parser("export")
+    export_parser.add_argument("file", help='output path, "-" for stdout')
+    export_parser.add_argument("--user", help="export only this user's workouts")
+    export_parser.add_argument("--format", choices=importer.FORMATS,
+                               help='defaults to the file extension, or csv for "-"')
+    export_parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+    if args.command in ("import", "export") and not args.format and not (args.command == "export" and args.file == "-"):
+        try:
+            importer.detect_format(args.file)
+        except ValueError as e:
+            parser.error(f"{e}; pass --format")
+
+    tracer = QueryTracer(capture_plans=True, log=lambda line: print(line, file=sys.stderr)) if args.trace_queries else None
+    manager = ConnectionManager(args.db, args.profile, tracer)
+    try:
+        with manager.database() as db:
+            return COMMANDS[args.command](db, args)
+    finally:
+        manager.close()
+        if tracer:
+            print(tracer.report(), file=sys.stderr)
+            tracer.export(args.trace_queries)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""Shared popups: message, confirm and form dialogs built once and reused.
+
+Every screen used to build a fresh Popup/BoxLayout/Label/Button tree for each message.
+Dialogs here are taken from a small per-kind pool instead: an idle instance (one that is
+not attached to the window) gets its title, text and callbacks rebound and is reopened,
+so showing a dialog allocates no widgets once the pool is warm.
+"""
+from kivy.uix.popup import Popup
+from kivy.uix.label import Label
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.button import Button
+from kivy.uix.textinput import TextInput
+
+POOL_SIZE = 3  # Idle dialogs kept per kind; more can be open at once, extras are not kept
+DIALOG_SIZE = (400, 300)
+
+
+class PooledDialog(Popup):
+    """Base for reusable dialogs; `ticket` changes every time the dialog is shown."""
+
+    def __init__(self, **kwargs):
+        super().__init__(size_hint=(None, None), size=DIALOG_SIZE, **kwargs)
+        self.ticket = 0
+        self.layout = BoxLayout(orientation="vertical", padding=10, spacing=10)
+        self.content = self.layout
+
+    @property
+    def idle(self):
+        return self.parent is None  # An open (or closing) popup is attached to the window
+
+    def showing(self, ticket):
+        """Whether the dialog is still open for the caller that got `ticket` from show()."""
+        return ticket == self.ticket and not self.idle
+
+    def present(self, title, size):
+        self.ticket += 1
+        self.title = title
+        self.size = size
+        self.open()
+        return self.ticket
+
+    def on_dismiss(self):
+        self.release()
+
+    def release(self):
+        """Drops the caller's callbacks so a closed dialog does not keep a screen alive."""
+
+
+class MessageDialog(PooledDialog):
+    """A message with an OK button."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.message = Label(font_size=16, size_hint_y=None, height=100)
+        close_button = Button(text="OK", size_hint_y=None, height=50)
+        close_button.bind(on_press=self.dismiss)
+        self.layout.add_widget(self.message)
+        self.layout.add_widget(close_button)
+
+    def show(self, title, message, size=DIALOG_SIZE):
+        self.message.text = message
+        return self.present(title, size)
+
+
+class ConfirmDialog(PooledDialog):
+    """A question with confirm and cancel buttons; on_confirm() runs after the dialog closes."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.on_confirm = None
+        self.message = Label(size_hint_y=None, height=40)
+        self.confirm_button = Button(size_hint_y=None, height=50)
+        cancel_button = Button(text="Cancel", size_hint_y=None, height=50)
+        self.confirm_button.bind(on_press=self.confirmed)
+        cancel_button.bind(on_press=self.dismiss)
+        for widget in (self.message, self.confirm_button, cancel_button):
+            self.layout.add_widget(widget)
+
+    def show(self, title, message, on_confirm, confirm_text="OK", size=DIALOG_SIZE):
+        self.message.text = message
+        self.confirm_button.text = confirm_text
+        self.on_confirm = on_confirm
+        return self.present(title, size)
+
+    def confirmed(self, *args):
+        on_confirm = self.on_confirm
+        self.dismiss()
+        if on_confirm:
+            on_confirm()
+
+    def release(self):
+        self.on_confirm = None
+
+
+class FormDialog(PooledDialog):
+    """Text fields with submit and cancel buttons.
+
+    on_submit(values, dialog) gets the stripped field texts; it reports problems with
+    dialog.set_status() and closes the dialog itself with dialog.dismiss() once done.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.on_submit = None
+        self.inputs = []  # Built on demand and kept for reuse; only the first len(fields) are shown
+        self.heading = Label(size_hint_y=None, height=30)
+        self.fields = BoxLayout(orientation="vertical", spacing=10, size_hint_y=None)
+        self.fields.bind(minimum_height=self.fields.setter("height"))
+        self.status = Label(font_size=14, size_hint_y=None, height=20, color=(1, 0, 0, 1))
+        self.submit_button = Button(size_hint_y=None, height=50)
+        cancel_button = Button(text="Cancel", size_hint_y=None, height=50)
+        self.submit_button.bind(on_press=self.submitted)
+        cancel_button.bind(on_press=self.dismiss)
+        for widget in (self.heading, self.fields, self.status, self.submit_button, cancel_button):
+            self.layout.add_widget(widget)
+
+    def show(self, title, heading, fields, on_submit, submit_text="Submit", size=DIALOG_SIZE):
+        """`fields` is a list of (hint text, is password) pairs."""
+        self.heading.text = heading
+        self.submit_button.text = submit_text
+        self.status.text = ""
+        self.on_submit = on_submit
+
+        while len(self.inputs) < len(fields):
+            self.inputs.append(TextInput(size_hint_y=None, height=40, multiline=False))
+        self.fields.clear_widgets()
+        for text_input, (hint, password) in zip(self.inputs, fields):
+            text_input.text = ""
+            text_input.hint_text = hint
+            text_input.password = password
+            self.fields.add_widget(text_input)
+        return self.present(title, size)
+
+    def values(self):
+        return [text_input.text.strip() for text_input in self.fields.children[::-1]]
+
+    def set_status(self, text):
+        self.status.text = text
+
+    def submitted(self, *args):
+        if self.on_submit:
+            self.on_submit(self.values(), self)
+
+    def release(self):
+        self.on_submit = None
+
+
+_pools = {}
+
+
+def acquire(kind):
+    """An idle dialog of the given class, reused from the pool or newly built."""
+    pool = _pools.setdefault(kind, [])
+    for dialog in pool:
+        if dialog.idle:
+            return dialog
+    dialog = kind()
+    if len(pool) < POOL_SIZE:
+        pool.append(dialog)
+    return dialog
+
+
+def show_message(title, message, size=DIALOG_SIZE):
+    """Shows a message with an OK button."""
+    return acquire(MessageDialog).show(title, message, size=size)
+
+
+def confirm(title, message, on_confirm, confirm_text="OK", size=DIALOG_SIZE):
+    """Asks a question; on_confirm() runs if the user confirms."""
+    return acquire(ConfirmDialog).show(title, message, on_confirm, confirm_text, size=size)
+
+
+def show_form(title, heading, fields, on_submit, submit_text="Submit", size=DIALOG_SIZE):
+    """Opens a form dialog and returns it (see FormDialog)."""
+    dialog = acquire(FormDialog)
+    dialog.show(title, heading, fields, on_submit, submit_text, size=size)
+    return dialog
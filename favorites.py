@@ -1,15 +1,31 @@
 from kivy.uix.screenmanager import Screen
+from kivy.app import App
 
 class FavoritesScreen(Screen):
-    def __init__(self, meal_plan_screen, **kwargs):
+    def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.meal_plan_screen = meal_plan_screen  # Reference to MealPlanScreen
+        self.store = None  # The logged-in user's FavoritesStore
+
+    def on_enter(self):
+        """Shows the cached favorites and keeps the list current while the screen is open."""
+        self.store = App.get_running_app().favorites
+        if self.store is not None:
+            self.store.bind(self.load_favorites)
+        self.load_favorites()
+
+    def on_leave(self):
+        if self.store is not None:
+            self.store.unbind(self.load_favorites)
 
     def load_favorites(self):
-        """Loads the saved favorite meals into the list."""
-        self.ids.favorites_list.text = "\n".join(self.meal_plan_screen.favorites) or "No favorites yet!"
+        """Renders the saved favorite meals from the in-memory cache."""
+        if self.store is None:
+            self.ids.favorites_list.text = "Log in to see your favorites."
+            return
+        self.ids.favorites_list.text = "\n".join(self.store) or "No favorites yet!"
 
     def clear_favorites(self):
         """Clears the favorites list."""
-        self.meal_plan_screen.favorites.clear()
+        if self.store is not None:
+            self.store.clear()
         self.load_favorites()
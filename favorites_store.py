@@ -0,0 +1,106 @@
+"""Per-user favorite meals: an in-memory ordered set backed by SQLite with write-behind."""
+from kivy.clock import Clock
+
+FLUSH_DELAY = 2.0  # Seconds of quiet before pending changes are written
+
+
+class FavoritesStore:
+    """Insertion-ordered set of the logged-in user's favorite meals.
+
+    Reads and membership checks hit the in-memory cache (a dict used as an ordered set),
+    so they are O(1) whatever the list length. Changes are queued and written in one
+    batch on the app's database worker once no change has arrived for FLUSH_DELAY
+    seconds, or when flush() is called on logout or exit.
+    """
+
+    def __init__(self, worker, username, flush_delay=FLUSH_DELAY):
+        self.worker = worker
+        self.username = username
+        self.flush_delay = flush_delay
+        self.loaded = False
+        self._items = {}
+        self._added = {}
+        self._removed = set()
+        self._cleared = False
+        self._flush_event = None
+        self._listeners = []
+
+    def __contains__(self, meal):
+        return meal in self._items
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+    def __len__(self):
+        return len(self._items)
+
+    def bind(self, listener):
+        """Calls listener() whenever the favorites change or finish loading."""
+        self._listeners.append(listener)
+
+    def unbind(self, listener):
+        self._listeners = [other for other in self._listeners if other != listener]
+
+    def load(self):
+        """Fetches the saved favorites in the background; changes made meanwhile are kept."""
+        username = self.username
+        self.worker.submit(lambda db: db.get_favorites(username), self._on_loaded,
+                           lambda error: print(f"Could not load favorites: {error}"))
+
+    def _on_loaded(self, meals):
+        items = {} if self._cleared else dict.fromkeys(meals)
+        for meal in self._removed:
+            items.pop(meal, None)
+        for meal in self._items:  # Added before the load finished
+            items.pop(meal, None)
+            items[meal] = None
+        self._items = items
+        self.loaded = True
+        self._changed()
+
+    def add(self, meal):
+        """Adds a meal at the end; returns False if it is already a favorite."""
+        if not meal or meal in self._items:
+            return False
+        self._items[meal] = None
+        self._added[meal] = None
+        self._changed()
+        return True
+
+    def remove(self, meal):
+        """Removes a meal; returns False if it was not a favorite."""
+        if meal not in self._items:
+            return False
+        del self._items[meal]
+        self._added.pop(meal, None)
+        self._removed.add(meal)
+        self._changed()
+        return True
+
+    def clear(self):
+        """Removes every favorite."""
+        self._items.clear()
+        self._added.clear()
+        self._removed.clear()
+        self._cleared = True
+        self._changed()
+
+    def _changed(self):
+        if self._added or self._removed or self._cleared:
+            if self._flush_event is not None:
+                self._flush_event.cancel()
+            self._flush_event = Clock.schedule_once(lambda dt: self.flush(), self.flush_delay)
+        for listener in self._listeners:
+            listener()
+
+    def flush(self):
+        """Writes pending changes now as a single batch; returns the DatabaseJob, or None if clean."""
+        if self._flush_event is not None:
+            self._flush_event.cancel()
+            self._flush_event = None
+        if not (self._added or self._removed or self._cleared):
+            return None
+        username, added, removed, cleared = self.username, list(self._added), list(self._removed), self._cleared
+        self._added, self._removed, self._cleared = {}, set(), False
+        return self.worker.submit(lambda db: db.save_favorites(username, added, removed, cleared), None,
+                                  lambda error: print(f"Could not save favorites: {error}"))
@@ -1,66 +1,117 @@
 from kivy.uix.screenmanager import Screen
 import random
 from kivy.app import App
-from database import Database  # Import the database module
+from data.events import WorkoutAdded, WorkoutsImported, WorkoutsReset
+from db_worker import AsyncDatabaseMixin
+from dialogs import show_message
+
+GOALS = {
+    "steps": "10,000",
+    "water": "2.5L",
+    "calories": "2,000 kcal"
+}
+
+MOTIVATIONAL_QUOTES = [
+    "Push yourself, because no one else is going to do it for you.",
+    "The body achieves what the mind believes.",
+    "Success starts with self-discipline."
+]
+
+
+class HomeScreen(AsyncDatabaseMixin, Screen):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.rendered = {}  # label id -> text last set, so unchanged labels are left alone
+        self.shown_summary = None
+        self.reset_pending = False  # The WorkoutsReset of our own reset_summary is already shown
+        for event_type in (WorkoutAdded, WorkoutsImported, WorkoutsReset):
+            self.subscribe(event_type, self.on_workouts_changed)
 
-class HomeScreen(Screen):
     def on_pre_enter(self):
         """Called before entering the screen to update the dashboard."""
         self.update_dashboard()
 
-    def update_dashboard(self):
-        """Fetches and updates the workout summary, goals, and motivational quote."""
-        db = Database()
-        username = self.get_logged_in_user()  # Get the actual logged-in user
-        summary = db.get_workout_summary(username)  # Fetch summary for current user
-        db.close()
-
-        goals = {
-            "steps": "10,000",
-            "water": "2.5L",
-            "calories": "2,000 kcal"
-        }
-
-        motivational_quotes = [
-            "Push yourself, because no one else is going to do it for you.",
-            "The body achieves what the mind believes.",
-            "Success starts with self-discipline."
-        ]
-
-        self.ids.workout_summary.text = (
+    def update_dashboard(self, force=False):
+        """Shows the session's cached summary, fetching it in the background only if it is stale."""
+        session = App.get_running_app().current_session()
+        if session and session.has("dashboard") and not force:
+            self.show_dashboard(session.get("dashboard"))
+            return
+
+        username = session.username if session else self.get_logged_in_user()
+        if session and force:
+            session.invalidate("dashboard")
+        version = session.version("dashboard") if session else None
+
+        def done(summary):
+            if session:
+                session.set("dashboard", summary, version)
+            self.show_dashboard(summary)
+
+        self.cancel_db_jobs()  # A newer refresh supersedes any pending one
+        if self.shown_summary is None:
+            self.set_label("workout_summary", "[b]Workout Summary:[/b]\nLoading...")
+        self.run_db(lambda db: db.get_workout_summary(username), done)
+
+    def show_dashboard(self, summary):
+        """Updates the workout summary, goals, and motivational quote where they changed."""
+        self.set_label("workout_summary", (
             f"[b]Workout Summary:[/b]\n"
             f"Total Workouts: {summary['total_workouts']}\n"
             f"Total Time: {summary['total_time']} mins\n"
             f"Total Calories Burned: {summary['total_calories']} kcal"
-        )
-        self.ids.today_goals.text = (
+        ))
+        self.set_label("today_goals", (
             f"[b]Today’s Goals:[/b]\n"
-            f"Steps: {goals['steps']}\n"
-            f"Water: {goals['water']}\n"
-            f"Calories: {goals['calories']}"
-        )
-        self.ids.motivation.text = random.choice(motivational_quotes)
+            f"Steps: {GOALS['steps']}\n"
+            f"Water: {GOALS['water']}\n"
+            f"Calories: {GOALS['calories']}"
+        ))
+        if summary != self.shown_summary:
+            self.set_label("motivation", random.choice(MOTIVATIONAL_QUOTES))
+        self.shown_summary = summary
+
+    def on_workouts_changed(self, event):
+        """Redraws a visible dashboard; the session has already patched or dropped its summary."""
+        if isinstance(event, WorkoutsReset) and self.reset_pending:
+            self.reset_pending = False  # Keep the reset message up until the next visit
+            return
+        if self.manager and self.manager.current == self.name:
+            self.update_dashboard()
+
+    def set_label(self, label_id, text):
+        """Sets a label's text unless it already shows it (each change costs a texture re-render)."""
+        if self.rendered.get(label_id) != text:
+            self.ids[label_id].text = text
+            self.rendered[label_id] = text
 
     def refresh_summary(self):
         """Refreshes the workout summary when the user presses the refresh button."""
         print("Refreshing workout summary...")
-        self.update_dashboard()
+        self.update_dashboard(force=True)
 
     def reset_summary(self):
         """Resets the workout summary by deleting all records from the database."""
-        db = Database()
         username = self.get_logged_in_user()
-        db.reset_workout_summary(username)  # Call the reset function in database
-        db.close()
+        self.cancel_db_jobs()  # Drop any in-flight summary so it cannot overwrite the reset
+        self.reset_pending = True
+
+        def failed(error):
+            self.reset_pending = False  # No WorkoutsReset is coming to clear it
+            show_message("Error", "Could not reset your workout data!")
+            self.update_dashboard(force=True)  # The workouts are still there; show them again
+
+        self.run_db(lambda db: db.reset_workout_summary(username), on_error=failed, cancel_on_leave=False)
 
-        self.ids.workout_summary.text = (
+        self.set_label("workout_summary", (
             f"[b]Workout Summary:[/b]\n"
             f"Total Workouts: 0\n"
             f"Total Time: 0 mins\n"
             f"Total Calories Burned: 0 kcal"
-        )
-        self.ids.today_goals.text = "[b]Today’s Goals:[/b]\nSteps: 0\nWater: 0L\nCalories: 0 kcal"
-        self.ids.motivation.text = "Workout data has been reset."
+        ))
+        self.set_label("today_goals", "[b]Today’s Goals:[/b]\nSteps: 0\nWater: 0L\nCalories: 0 kcal")
+        self.set_label("motivation", "Workout data has been reset.")
+        self.shown_summary = None  # Show fresh goals and a quote on the next visit
 
     def go_to(self, screen_name):
         """Navigates to a different screen."""
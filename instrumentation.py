@@ -0,0 +1,130 @@
+"""Opt-in startup and navigation timing, written as a Chrome trace.
+
+Set FITNESS_TRACE=1 (or FITNESS_TRACE=path/to/trace.json) to record KV loads, screen
+construction, screen enter/leave handlers, background database jobs and slow frames.
+The trace is written when the app stops; open it in chrome://tracing or ui.perfetto.dev.
+With the variable unset every hook is a no-op.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+TRACE_ENV = "FITNESS_TRACE"
+DEFAULT_TRACE_PATH = "fitness_trace.json"
+SCREEN_EVENTS = ("on_pre_enter", "on_enter", "on_pre_leave", "on_leave")
+FRAME_SPIKE_SECONDS = 1 / 30  # Frames slower than this are recorded
+
+
+class Tracer:
+    """Collects Chrome trace events ("X" spans and "i" instants) from any thread."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.enabled = bool(path)
+        self.started = time.perf_counter()
+        self._events = []
+        self._lock = threading.Lock()
+        self._last_frame = None
+
+    def _micros(self, seconds):
+        return round((seconds - self.started) * 1_000_000, 1)
+
+    def complete(self, name, category, started, ended, **args):
+        """Records a span between two time.perf_counter() readings."""
+        if not self.enabled:
+            return
+        event = {"name": name, "cat": category, "ph": "X", "ts": self._micros(started),
+                 "dur": round((ended - started) * 1_000_000, 1), "pid": os.getpid(),
+                 "tid": threading.get_ident(), "args": args}
+        with self._lock:
+            self._events.append(event)
+
+    def instant(self, name, category, **args):
+        """Records a point-in-time marker such as a screen switch."""
+        if not self.enabled:
+            return
+        event = {"name": name, "cat": category, "ph": "i", "s": "p", "ts": self._micros(time.perf_counter()),
+                 "pid": os.getpid(), "tid": threading.get_ident(), "args": args}
+        with self._lock:
+            self._events.append(event)
+
+    @contextmanager
+    def span(self, name, category="app", **args):
+        """Times the body of a with block."""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.complete(name, category, started, time.perf_counter(), **args)
+
+    def wrap(self, function, name=None, category="app"):
+        """Returns `function` timed as a span, or unchanged when tracing is off."""
+        if not self.enabled:
+            return function
+        name = name or getattr(function, "__qualname__", repr(function))
+
+        @wraps(function)
+        def timed(*args, **kwargs):
+            with self.span(name, category):
+                return function(*args, **kwargs)
+        return timed
+
+    def instrument_screen(self, screen):
+        """Times the screen's enter/leave handlers (update_dashboard and friends run inside them).
+
+        Kivy dispatches these events by looking the handler up on the instance, so an
+        instance attribute shadowing the method is enough.
+        """
+        if not self.enabled:
+            return
+        for event in SCREEN_EVENTS:
+            handler = getattr(screen, event, None)
+            if handler is not None:
+                setattr(screen, event, self.wrap(handler, f"{type(screen).__name__}.{event}", "screen"))
+
+    def watch_frames(self, manager, threshold=FRAME_SPIKE_SECONDS):
+        """Records every frame slower than `threshold`, noting the screen and whether a transition ran."""
+        if not self.enabled:
+            return
+        from kivy.clock import Clock
+
+        def tick(dt):
+            now = time.perf_counter()
+            if self._last_frame is not None and now - self._last_frame > threshold:
+                self.complete("slow frame", "frame", self._last_frame, now, screen=manager.current,
+                              transition=bool(manager.transition.is_active))
+            self._last_frame = now
+        Clock.schedule_interval(tick, 0)
+
+    def events(self):
+        with self._lock:
+            return list(self._events)
+
+    def dump(self, path=None):
+        """Writes the trace (Chrome JSON object format) and returns its path, or None when disabled."""
+        if not self.enabled:
+            return None
+        path = path or self.path
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump({"traceEvents": self.events(), "displayTimeUnit": "ms"}, handle)
+        print(f"Trace with {len(self._events)} events written to {path}")
+        return path
+
+
+def _trace_path():
+    value = os.environ.get(TRACE_ENV, "")
+    if value.lower() in ("", "0", "false", "no"):
+        return None
+    return DEFAULT_TRACE_PATH if value.lower() in ("1", "true", "yes") else value
+
+
+tracer = Tracer(_trace_path())
+if tracer.enabled:
+    atexit.register(tracer.dump)  # At interpreter exit, so runs that never reach on_stop still dump
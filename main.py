@@ -1,28 +1,18 @@
+import time
+from instrumentation import tracer  # First, so its clock starts before Kivy is imported
 from kivy.app import App
-from kivy.uix.screenmanager import ScreenManager, Screen
+from kivy.clock import Clock
+from kivy.uix.screenmanager import Screen
 from auth import Auth
-from home import HomeScreen
-from kivy.lang import Builder
-from workout import WorkoutScreen
-from mealplan import MealPlanScreen  
-from favorites import FavoritesScreen  
-from teams import TeamsScreen 
-from user_profile import ProfileScreen
-from settings import SettingsScreen
-
-
-# Load Kivy files
-Builder.load_file("Auth.kv")
-Builder.load_file("login.kv")
-Builder.load_file("signup.kv")
-Builder.load_file("forgot.kv")
-Builder.load_file("home.kv")
-Builder.load_file("workout.kv")
-Builder.load_file("mealplan.kv")  
-Builder.load_file("favorites.kv")
-Builder.load_file("teams.kv")
-Builder.load_file("user_profile.kv")
-Builder.load_file("settings.kv")
+from screens import LazyScreenManager
+from data import ConnectionManager
+from data.events import Event
+from db_worker import DatabaseWorker
+from data import passwords
+from session import Session
+from favorites_store import FavoritesStore
+from settings_service import SettingsService
+
 
 auth = Auth()
 
@@ -55,37 +45,95 @@ class ForgotScreen(Screen):
 class FitnessApp(App):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.theme = "dark"  # Default to dark mode
+        self.settings = SettingsService().load()  # Read once; saved in the background on change
+        self.theme = self.settings["theme"]
+        self.units = self.settings["units"]
+        self.timer_mode = self.settings["timer_mode"]
+        self.db_manager = ConnectionManager()  # Shared connections for every screen
+        self.db_worker = DatabaseWorker(self.db_manager)  # Keeps queries off the UI thread
+        self.auth_worker = DatabaseWorker(self.db_manager, workers=2)  # Password hashing pool
+        self.session = None
+        self.favorites = None
 
     def build(self):
-        sm = ScreenManager()
-        sm.add_widget(Auth(name="auth"))
-        sm.add_widget(LoginScreen(name="login"))
-        sm.add_widget(SignupScreen(name="signup"))
-        sm.add_widget(ForgotScreen(name="forgot"))
-        sm.add_widget(HomeScreen(name="home")) 
-        sm.add_widget(WorkoutScreen(name="workout"))
-        sm.add_widget(TeamsScreen(name="teams"))
-        sm.add_widget(ProfileScreen(name="profile"))
-        sm.add_widget(SettingsScreen(name="settings"))
-
-        try:
-            meal_plan_screen = MealPlanScreen(name="mealplan")
-            sm.add_widget(meal_plan_screen)
-        except Exception as e:
-            print(f"Error loading MealPlanScreen: {e}")
-
-        try:
-            favorites_screen = FavoritesScreen(meal_plan_screen, name="favorites")
-            sm.add_widget(favorites_screen)
-        except Exception as e:
-            print(f"Error loading FavoritesScreen: {e}")
-
+        # Screens are imported, get their KV rules and are constructed on first visit.
+        sm = LazyScreenManager()
+        sm.register("auth", Auth, ["auth.kv"], prewarm=["home"])
+        sm.register("login", LoginScreen, ["login.kv"])
+        sm.register("signup", SignupScreen, ["signup.kv"])
+        sm.register("forgot", ForgotScreen, ["forgot.kv"])
+        sm.register("home", "home:HomeScreen", ["home.kv"], prewarm=["workout", "teams", "profile"])
+        sm.register("workout", "workout:WorkoutScreen", ["workout.kv"])
+        sm.register("teams", "teams:TeamsScreen", ["teams.kv"])
+        sm.register("profile", "user_profile:ProfileScreen", ["user_profile.kv"])
+        sm.register("settings", "settings:SettingsScreen", ["settings.kv"])
+        sm.register("mealplan", "mealplan:MealPlanScreen", ["mealplan.kv"], prewarm=["favorites"])
+        sm.register("favorites", "favorites:FavoritesScreen", ["favorites.kv"])
+        sm.current = "auth"
+        tracer.watch_frames(sm)
         return sm
+
+    def on_start(self):
+        """Calibrates the password hashing cost for this device in the background."""
+        # Startup span: from the first import of this module to the first frame being drawn.
+        Clock.schedule_once(lambda dt: tracer.complete("startup", "app", tracer.started, time.perf_counter()))
+        self.auth_worker.submit(lambda db: passwords.calibrate(),
+                                lambda cost: print(f"Password hashing cost calibrated to {cost}"))
+
+    def start_session(self, user):
+        """Opens a session for the (id, username, email) row returned by validate_user."""
+        self.end_session()
+        self.session = Session(*user)
+        self.logged_in_user = self.session.username
+        self.db_manager.events.subscribe(Event, self.session.on_event)
+        self.favorites = FavoritesStore(self.db_worker, self.session.username)
+        self.favorites.load()
+
+    def end_session(self):
+        """Logs out: drops the session and stops it listening for database changes."""
+        if self.session:
+            self.db_manager.events.unsubscribe(Event, self.session.on_event)
+        if self.favorites is not None:
+            self.favorites.flush()  # Write pending changes before the user's cache goes away
+        self.session = None
+        self.favorites = None
+        self.logged_in_user = None
+
+    def current_session(self):
+        """Returns the active session, or None if nobody is logged in or it has expired."""
+        if self.session and not self.session.is_valid():
+            self.end_session()
+        return self.session
+
+    def database(self):
+        """Borrows a Database on the shared connection: `with app.database() as db:`."""
+        return self.db_manager.database()
+
+    def on_pause(self):
+        """Saves pending changes and keeps the app alive in the background (running timers included)."""
+        if self.favorites is not None:
+            self.favorites.flush()
+        self.settings.flush()
+        return True
+
+    def on_resume(self):
+        """Redraws the workout timer straight away; it kept counting while the app was paused."""
+        if self.root.current == "workout":
+            self.root.get_screen("workout").refresh_timer()
+
+    def on_stop(self):
+        """Drains pending database work and closes the shared connections when the app exits."""
+        if self.favorites is not None:
+            self.favorites.flush()
+        self.settings.flush()
+        self.auth_worker.stop()
+        self.db_worker.stop()
+        self.db_manager.close()
     
     def toggle_theme(self):
         """Toggles between light and dark mode."""
         self.theme = "dark" if self.theme == "light" else "light"
+        self.settings.update(theme=self.theme)
         print(f"Theme switched to {self.theme}")  
 
 if __name__ == "__main__":
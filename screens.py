@@ -0,0 +1,98 @@
+"""Lazy screen registry: screens get their KV rules and are built the first time they are shown."""
+import importlib
+from kivy.clock import Clock
+from kivy.lang import Builder
+from kivy.uix.screenmanager import ScreenManager
+from instrumentation import tracer
+
+
+class ScreenSpec:
+    """How to build one screen: its factory, the KV files it needs and the screens to prewarm after it."""
+
+    def __init__(self, name, factory, kv_files=(), prewarm=()):
+        self.name = name
+        self.factory = factory
+        self.kv_files = tuple(kv_files)
+        self.prewarm = tuple(prewarm)
+
+
+class LazyScreenManager(ScreenManager):
+    """ScreenManager that builds registered screens on first use.
+
+    ScreenManager looks screens up through get_screen() whenever `current` changes, so
+    overriding it is enough to import the screen's module, load its KV file(s) and
+    construct it on demand. Once a screen has been shown, the screens listed in its
+    `prewarm` are built in idle frames, one per frame, so the likely next transition
+    does not pay for it.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._specs = {}
+        self._loaded_kv = set()
+        self._prewarm_queue = []
+        self._prewarm_event = None
+
+    def register(self, name, factory, kv_files=(), prewarm=()):
+        """Registers a screen without building it.
+
+        `factory` is a Screen class, a "module:Class" string (the module is imported on
+        first use) or a callable(manager, name) returning the screen.
+        """
+        self._specs[name] = ScreenSpec(name, factory, kv_files, prewarm)
+
+    def is_built(self, name):
+        return self.has_screen(name)
+
+    def get_screen(self, name):
+        if not self.has_screen(name) and name in self._specs:
+            self._build(name)
+        return super().get_screen(name)
+
+    def on_current(self, instance, value):
+        tracer.instant(f"switch to {value}", "screen", transition=type(self.transition).__name__)
+        super().on_current(instance, value)
+        spec = self._specs.get(value)
+        if spec and spec.prewarm:
+            self.prewarm(*spec.prewarm)
+
+    def prewarm(self, *names):
+        """Builds the named screens in the background, one per frame, after the current transition."""
+        for name in names:
+            if name in self._specs and not self.has_screen(name) and name not in self._prewarm_queue:
+                self._prewarm_queue.append(name)
+        if self._prewarm_queue and self._prewarm_event is None:
+            # Wait for the running transition so building does not drop its frames.
+            self._prewarm_event = Clock.schedule_once(self._prewarm_next, self.transition.duration)
+
+    def _prewarm_next(self, dt):
+        self._prewarm_event = None
+        while self._prewarm_queue:
+            name = self._prewarm_queue.pop(0)
+            if self.has_screen(name):
+                continue
+            try:
+                self._build(name)
+            except Exception as e:
+                print(f"Error prewarming screen '{name}': {e}")
+            break
+        if self._prewarm_queue:
+            self._prewarm_event = Clock.schedule_once(self._prewarm_next, 0)
+
+    def _build(self, name):
+        spec = self._specs[name]
+        for path in spec.kv_files:
+            if path not in self._loaded_kv:
+                with tracer.span(f"Builder.load_file {path}", "kv"):
+                    Builder.load_file(path)
+                self._loaded_kv.add(path)
+        factory = spec.factory
+        if isinstance(factory, str):
+            module, _, attribute = factory.partition(":")
+            with tracer.span(f"import {module}", "import"):
+                factory = getattr(importlib.import_module(module), attribute)
+        with tracer.span(f"build {name}", "screen"):
+            screen = factory(name=name) if isinstance(factory, type) else factory(self, name)
+        tracer.instrument_screen(screen)
+        self.add_widget(screen)
+        return screen
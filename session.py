@@ -0,0 +1,116 @@
+import secrets
+import threading
+import time
+
+from data.events import MeasurementsUpdated, WorkoutAdded, WorkoutsReset
+
+SESSION_TTL = 12 * 60 * 60  # Seconds a login stays valid
+
+# Which cached session values each kind of Database change event makes stale.
+INVALIDATES = {
+    "profile": ("profile",),
+    "team": ("team", "is_admin"),
+    "workouts": ("dashboard",),
+}
+
+
+def patched_dashboard(summary, event):
+    """The dashboard summary after a workout event, or None if it has to be fetched again."""
+    if isinstance(event, WorkoutsReset):
+        return {"total_workouts": 0, "total_time": 0, "total_calories": 0}
+    if isinstance(event, WorkoutAdded) and summary is not None:
+        return {
+            "total_workouts": summary["total_workouts"] + 1,
+            "total_time": summary["total_time"] + event.workout["duration"],
+            "total_calories": summary["total_calories"] + event.workout["calories"],
+        }
+    return None
+
+
+def patched_profile(profile, event):
+    """The profile after a measurements update, or None if it has to be fetched again."""
+    if isinstance(event, MeasurementsUpdated) and profile:
+        return {**profile, "weight": event.weight, "height": event.height, "body_fat": event.body_fat,
+                "bmi": event.bmi}
+    return None
+
+
+# Cached values whose new value can be computed from the old one and the event payload.
+PATCHERS = {
+    "dashboard": patched_dashboard,
+    "profile": patched_profile,
+}
+
+
+class Session:
+    """Authenticated user state created at login and shared by every screen.
+
+    Holds the resolved user id plus lazily cached profile, team, admin role and dashboard
+    summary so screens do not re-query them on every on_enter. Database writes invalidate
+    (or, where the new value follows from the event, patch) the affected values through
+    the ConnectionManager's event bus; entries are versioned so a query that was already in flight when its value
+    was invalidated cannot store a stale result.
+    """
+
+    def __init__(self, user_id, username, email, ttl=SESSION_TTL):
+        self.token = secrets.token_urlsafe(32)
+        self.user_id = user_id
+        self.username = username
+        self.email = email
+        self.expires_at = time.monotonic() + ttl
+        self._lock = threading.Lock()
+        self._values = {}
+        self._versions = {}
+
+    def is_valid(self):
+        """True until the session's TTL runs out."""
+        return time.monotonic() < self.expires_at
+
+    def has(self, key):
+        """True if `key` is cached (a cached value may itself be None, e.g. no team)."""
+        with self._lock:
+            return key in self._values
+
+    def get(self, key, default=None):
+        """Returns the cached value for `key`, or `default` if it is not cached."""
+        with self._lock:
+            return self._values.get(key, default)
+
+    def version(self, key):
+        """Returns the current version of `key`; pass it back to set() after a fetch."""
+        with self._lock:
+            return self._versions.get(key, 0)
+
+    def set(self, key, value, version=None):
+        """Caches `value` unless `key` was invalidated since `version` was read."""
+        with self._lock:
+            if version is not None and version != self._versions.get(key, 0):
+                return False
+            self._values[key] = value
+            return True
+
+    def invalidate(self, *keys):
+        """Drops cached values so the next reader fetches them again."""
+        with self._lock:
+            self._invalidate(keys)
+
+    def _invalidate(self, keys):
+        for key in keys:
+            self._values.pop(key, None)
+            self._versions[key] = self._versions.get(key, 0) + 1
+
+    def on_event(self, event):
+        """EventBus subscriber: invalidates (or patches) whatever a write to this user made stale."""
+        if event.username not in (None, self.username):
+            return
+        keys = INVALIDATES.get(event.change, ())
+        with self._lock:
+            previous = {key: self._values.get(key) for key in keys}
+            self._invalidate(keys)
+            if event.username is None:
+                return
+            # Invalidating bumped the versions, so a fetch already in flight cannot overwrite these.
+            for key, value in previous.items():
+                value = PATCHERS[key](value, event) if key in PATCHERS else None
+                if value is not None:
+                    self._values[key] = value
@@ -1,13 +1,8 @@
 from kivy.uix.screenmanager import Screen
 from kivy.app import App
-from kivy.storage.jsonstore import JsonStore
 from kivy.core.window import Window
 
 class SettingsScreen(Screen):
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.store = JsonStore("settings.json")  # Persistent storage
-
     def on_enter(self):
         """Load saved settings and apply theme when entering the settings screen."""
         self.load_settings()
@@ -28,8 +23,8 @@ class SettingsScreen(Screen):
         # Apply text color updates
         self.update_text_colors(text_color)
 
-        # Save to storage
-        self.store.put("settings", theme=app.theme)
+        # Saved in the background by the settings service
+        app.settings.update(theme=app.theme)
         print(f"Theme changed to: {app.theme}")
 
     def update_text_colors(self, color):
@@ -43,20 +38,20 @@ class SettingsScreen(Screen):
         """Change units between metric (kg/cm) and imperial (lbs/inches)."""
         app = App.get_running_app()
         app.units = unit_choice
-        self.store.put("settings", units=unit_choice)
+        app.settings.update(units=unit_choice)
         print(f"Units changed to: {unit_choice}")
 
     def change_timer_mode(self, mode):
         """Switch between Stopwatch and Countdown Timer."""
         app = App.get_running_app()
         app.timer_mode = mode
-        self.store.put("settings", timer_mode=mode)
+        app.settings.update(timer_mode=mode)
         print(f"Timer mode set to: {mode}")
 
     def logout(self):
         """Log out and return to login screen."""
         app = App.get_running_app()
-        app.logged_in_user = None  # Clear logged-in user
+        app.end_session()  # Clear logged-in user and cached session data
         self.manager.current = "login"
         print("User logged out!")
 
@@ -66,25 +61,20 @@ class SettingsScreen(Screen):
         print("Back to Home")
 
     def load_settings(self):
-        """Load settings from storage and apply them."""
-        if self.store.exists("settings"):
-            settings = self.store.get("settings")
-
-            # Apply saved settings
-            app = App.get_running_app()
-            app.theme = settings.get("theme", "light")
-            app.units = settings.get("units", "kg/cm")
-            app.timer_mode = settings.get("timer_mode", "Stopwatch")
+        """Show the settings loaded at app start and apply the theme."""
+        app = App.get_running_app()
 
-            # Apply theme
-            is_dark = app.theme == "dark"
-            self.ids.theme_switch.active = is_dark
+        # Reflect the current settings in the widgets (unchanged values are not saved again)
+        is_dark = app.theme == "dark"
+        self.ids.theme_switch.active = is_dark
+        self.ids.unit_spinner.text = app.units
+        self.ids.timer_spinner.text = app.timer_mode
 
-            if is_dark:
-                Window.clearcolor = (0, 0, 0, 1)  # Dark mode background
-                text_color = (1, 1, 1, 1)  # White text
-            else:
-                Window.clearcolor = (1, 1, 1, 1)  # Light mode background
-                text_color = (0, 0, 0, 1)  # Black text
+        if is_dark:
+            Window.clearcolor = (0, 0, 0, 1)  # Dark mode background
+            text_color = (1, 1, 1, 1)  # White text
+        else:
+            Window.clearcolor = (1, 1, 1, 1)  # Light mode background
+            text_color = (0, 0, 0, 1)  # Black text
 
-            self.update_text_colors(text_color)
+        self.update_text_colors(text_color)
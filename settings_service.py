@@ -0,0 +1,118 @@
+"""App settings held in memory and saved with debounced, atomic write-behind."""
+import json
+import os
+import threading
+
+from data import STORAGE_PROFILES
+
+SETTINGS_PATH = "settings.json"
+SAVE_DELAY = 0.5  # Seconds without changes before settings are written
+
+# name -> (default, allowed values)
+SETTINGS = {
+    "theme": ("dark", ("light", "dark")),
+    "units": ("kg/cm", ("kg/cm", "lbs/inches")),
+    "timer_mode": ("Stopwatch", ("Stopwatch", "Countdown")),
+    "storage_profile": ("balanced", tuple(STORAGE_PROFILES)),
+}
+
+
+class SettingsService:
+    """Typed app settings, loaded once at startup and shared by every screen.
+
+    update() merges a partial change into memory and returns immediately; the whole
+    document is written on a background timer once no change has arrived for SAVE_DELAY
+    seconds, to a temporary file that then replaces settings.json, so a crash can never
+    leave a half-written file. The file keeps the {"settings": {...}} layout JsonStore
+    used, and keys this version does not know about are preserved.
+    """
+
+    def __init__(self, path=SETTINGS_PATH, save_delay=SAVE_DELAY):
+        self.path = path
+        self.save_delay = save_delay
+        self._lock = threading.Lock()  # Guards the values; never held while writing the file
+        self._write_lock = threading.Lock()  # One flush writes at a time, so an older snapshot never lands last
+        self._values = {name: default for name, (default, _) in SETTINGS.items()}
+        self._extra = {}
+        self._dirty = False
+        self._timer = None
+
+    def load(self):
+        """Reads the settings file; missing or invalid values fall back to their defaults."""
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                stored = json.load(handle).get("settings", {})
+        except FileNotFoundError:
+            return self
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"Could not read {self.path}, using default settings: {e}")
+            return self
+
+        with self._lock:
+            for name, value in stored.items():
+                if name not in SETTINGS:
+                    self._extra[name] = value
+                elif value in SETTINGS[name][1]:
+                    self._values[name] = value
+                else:
+                    print(f"Ignoring invalid setting {name}={value!r}")
+        return self
+
+    def get(self, name):
+        with self._lock:
+            return self._values[name]
+
+    def __getitem__(self, name):
+        return self.get(name)
+
+    def as_dict(self):
+        with self._lock:
+            return dict(self._values)
+
+    def update(self, **changes):
+        """Merges new values into the settings and schedules a save; returns what actually changed."""
+        for name, value in changes.items():
+            if name not in SETTINGS:
+                raise KeyError(f"Unknown setting '{name}'")
+            if value not in SETTINGS[name][1]:
+                raise ValueError(f"Invalid value {value!r} for '{name}', expected one of {SETTINGS[name][1]}")
+
+        with self._lock:
+            changed = {name: value for name, value in changes.items() if self._values[name] != value}
+            if not changed:
+                return changed
+            self._values.update(changed)
+            self._dirty = True
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.save_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+        return changed
+
+    def flush(self):
+        """Writes pending changes now (atomically); returns True if anything was written."""
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return False
+                document = {"settings": {**self._extra, **self._values}}
+                self._dirty = False
+
+            # get() and update() carry on while the file is written and synced.
+            temporary = f"{self.path}.tmp"
+            try:
+                with open(temporary, "w", encoding="utf-8") as handle:
+                    json.dump(document, handle)
+                    handle.flush()
+                    os.fsync(handle.fileno())
+                os.replace(temporary, self.path)
+            except OSError as e:
+                with self._lock:
+                    self._dirty = True  # Try again on the next flush
+                print(f"Could not save settings: {e}")
+                return False
+        return True
@@ -1,19 +1,25 @@
 from kivy.uix.screenmanager import Screen
 from kivy.clock import Clock
-from kivy.uix.popup import Popup
-from kivy.uix.label import Label
-from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.button import Button
-from kivy.uix.textinput import TextInput
-from database import Database
-
-class TeamsScreen(Screen):
+from kivy.app import App
+from data.events import TeamDeleted, TeamEvent, TeamJoined, TeamLeft
+from db_worker import AsyncDatabaseMixin
+from dialogs import confirm, show_form, show_message
+
+class TeamsScreen(AsyncDatabaseMixin, Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.username = "test_user"  # Replace with actual logged-in user
+        self.current_team = None
+        self.is_admin = False
+        self.subscribe(TeamEvent, self.on_team_changed)
 
     def on_enter(self):
         """Ensures UI is fully loaded before accessing self.ids."""
+        session = App.get_running_app().current_session()
+        if not session:
+            self.manager.current = "auth"  # Session expired or logged out
+            return
+        self.username = session.username
         Clock.schedule_once(self.delayed_load, 0.1)
 
     def delayed_load(self, dt):
@@ -21,176 +27,200 @@ class TeamsScreen(Screen):
         self.check_user_team()
 
     def check_user_team(self):
-        """Checks if the user is in a team and updates the UI."""
-        db = Database()
-        self.current_team = db.get_user_team(self.username)
-        self.is_admin = db.is_team_admin(self.username, self.current_team) if self.current_team else False
-        db.close()
+        """Checks if the user is in a team, using the session cache before the database."""
+        session = App.get_running_app().current_session()
+        if session and session.has("team") and session.has("is_admin"):
+            self.show_team_status((session.get("team"), session.get("is_admin")))
+            return
+
+        username = self.username
+        versions = (session.version("team"), session.version("is_admin")) if session else None
+
+        def fetch(db):
+            team = db.get_user_team(username)
+            return team, db.is_team_admin(username, team) if team else False
+
+        def done(result):
+            if session:
+                session.set("team", result[0], versions[0])
+                session.set("is_admin", result[1], versions[1])
+            self.show_team_status(result)
 
+        self.run_db(fetch, done)
+
+    def show_team_status(self, status):
+        """Records the user's team and admin role and reports them."""
+        self.current_team, self.is_admin = status
         if self.current_team:
-            self.show_popup("Team Info", f"You are in Team: {self.current_team}")
+            show_message("Team Info", f"You are in Team: {self.current_team}")
         else:
-            self.show_popup("No Team", "You are not in a team.")
+            show_message("No Team", "You are not in a team.")
+
+    def on_team_changed(self, event):
+        """Keeps the user's team and admin role current as memberships change."""
+        if isinstance(event, TeamJoined) and event.username == self.username:
+            self.current_team, self.is_admin = event.team, event.admin
+        elif isinstance(event, TeamLeft) and event.username == self.username:
+            self.current_team, self.is_admin = None, False
+        elif isinstance(event, TeamDeleted) and event.team == self.current_team:
+            self.current_team, self.is_admin = None, False
 
     def load_teams(self):
         """Fetches and displays available teams in a popup."""
-        db = Database()
-        teams = db.get_teams()
-        db.close()
+        def done(teams):
+            if teams:
+                team_list = "\n".join([f"{team['name']} - {team['members']} members" for team in teams])
+                show_message("Available Teams", team_list)
+            else:
+                show_message("No Teams Found", "No teams available. Create one!")
 
-        if teams:
-            team_list = "\n".join([f"{team['name']} - {team['members']} members" for team in teams])
-            self.show_popup("Available Teams", team_list)
-        else:
-            self.show_popup("No Teams Found", "No teams available. Create one!")
+        self.run_db(lambda db: db.get_teams(), done)
 
     def create_team(self):
         """Creates a new team and shows a popup with the result."""
         team_name = self.ids.team_name_input.text.strip()
         if not team_name:
-            self.show_popup("Error", "Enter a valid team name!")
+            show_message("Error", "Enter a valid team name!")
             return
 
-        db = Database()
-        result = db.add_team(team_name, self.username)
-        db.close()
+        def done(result):
+            if result:
+                show_message("Success", f"Team '{team_name}' created successfully!")
+            else:
+                show_message("Error", "Team name already exists!")
 
-        if result:
-            self.show_popup("Success", f"Team '{team_name}' created successfully!")
-        else:
-            self.show_popup("Error", "Team name already exists!")
+        username = self.username
+        self.run_db(lambda db: db.add_team(team_name, username), done, cancel_on_leave=False)
 
     def join_team(self):
         """Allows the user to join an existing team and shows a popup."""
         team_name = self.ids.team_join_input.text.strip()
         if not team_name:
-            self.show_popup("Error", "Enter a valid team name to join!")
+            show_message("Error", "Enter a valid team name to join!")
             return
 
-        db = Database()
-        result = db.join_team(team_name, self.username)
-        db.close()
+        def done(result):
+            if result:
+                show_message("Success", f"Joined team '{team_name}' successfully!")
+            else:
+                show_message("Error", "Team not found or already a member!")
 
-        if result:
-            self.show_popup("Success", f"Joined team '{team_name}' successfully!")
-        else:
-            self.show_popup("Error", "Team not found or already a member!")
+        username = self.username
+        self.run_db(lambda db: db.join_team(team_name, username), done, cancel_on_leave=False)
 
     def leave_team(self):
         """Allows the user to leave their team and shows a popup."""
-        db = Database()
-        result = db.leave_team(self.username)
-        db.close()
+        def done(result):
+            if result:
+                show_message("Success", "You left the team successfully!")
+            else:
+                show_message("Error", "You are not in a team!")
 
-        if result:
-            self.show_popup("Success", "You left the team successfully!")
-        else:
-            self.show_popup("Error", "You are not in a team!")
+        username = self.username
+        self.run_db(lambda db: db.leave_team(username), done, cancel_on_leave=False)
 
     def show_team_members(self):
         """Displays the members of the user's current team in a popup."""
-        db = Database()
-        team_name = db.get_user_team(self.username)
-        members = db.get_team_members(team_name) if team_name else []
-        db.close()
-
-        if team_name and members:
-            member_list = "\n".join(members)
-            self.show_popup(f"Members of {team_name}", member_list)
-        else:
-            self.show_popup("No Members", "You are not in a team or the team has no members.")
+        username = self.username
+
+        def fetch(db):
+            team = db.get_user_team(username)
+            return team, db.get_team_members(team) if team else []
+
+        def done(result):
+            team_name, members = result
+            if team_name and members:
+                member_list = "\n".join(members)
+                show_message(f"Members of {team_name}", member_list)
+            else:
+                show_message("No Members", "You are not in a team or the team has no members.")
+
+        self.run_db(fetch, done)
+
+    def show_leaderboard(self, metric="calories", days=7):
+        """Shows the top teams over the last `days` days in a popup."""
+        def done(board):
+            if board:
+                rows = "\n".join(f"{entry['rank']}. {entry['team']} - {entry[metric]} {metric}" for entry in board)
+                show_message(f"Top Teams ({days} days)", rows)
+            else:
+                show_message("Leaderboard", "No team activity yet.")
+
+        self.run_db(lambda db: db.get_team_leaderboard(metric, days=days), done)
+
+    def show_member_leaderboard(self, metric="calories", days=7):
+        """Shows the top members of the user's team over the last `days` days in a popup."""
+        username = self.username
+
+        def fetch(db):
+            team = db.get_user_team(username)
+            return team, db.get_team_member_leaderboard(team, metric, days=days) if team else []
+
+        def done(result):
+            team_name, board = result
+            if not team_name:
+                show_message("Error", "You are not in a team!")
+                return
+            rows = "\n".join(f"{entry['rank']}. {entry['username']} - {entry[metric]} {metric}" for entry in board)
+            show_message(f"Top Members of {team_name} ({days} days)", rows)
+
+        self.run_db(fetch, done)
 
     def remove_member_popup(self):
         """Shows a popup to remove a team member."""
         if not self.current_team:
-            self.show_popup("Error", "You are not in a team!")
+            show_message("Error", "You are not in a team!")
             return
 
-        db = Database()
-        is_admin = db.is_team_admin(self.username, self.current_team)
-        db.close()
+        username, team_name = self.username, self.current_team
+        self.run_db(lambda db: db.is_team_admin(username, team_name), self.open_remove_member_popup)
 
+    def open_remove_member_popup(self, is_admin):
+        """Opens the remove-member form once admin rights are confirmed."""
         if not is_admin:
-            self.show_popup("Error", "Only the team admin can remove members!")
+            show_message("Error", "Only the team admin can remove members!")
             return
 
-        popup_layout = BoxLayout(orientation="vertical", padding=10, spacing=10)
-        member_input = TextInput(hint_text="Enter member username", size_hint_y=None, height=40)
-        remove_button = Button(text="Remove", size_hint_y=None, height=50)
-        close_button = Button(text="Cancel", size_hint_y=None, height=50)
+        def remove_member_action(values, dialog):
+            member = values[0]
+            username, team_name = self.username, self.current_team
 
-        popup_layout.add_widget(Label(text="Enter member username to remove:", size_hint_y=None, height=30))
-        popup_layout.add_widget(member_input)
-        popup_layout.add_widget(remove_button)
-        popup_layout.add_widget(close_button)
+            def done(result):
+                if result:
+                    show_message("Success", f"Removed {member} from team!")
+                else:
+                    show_message("Error", "Member not found or not removable!")
 
-        popup = Popup(title="Remove Team Member", content=popup_layout, size_hint=(None, None), size=(400, 300))
-        
-        def remove_member_action(instance):
-            db = Database()
-            result = db.remove_member(self.username, self.current_team, member_input.text.strip())
-            db.close()
+            self.run_db(lambda db: db.remove_member(username, team_name, member), done, cancel_on_leave=False)
+            dialog.dismiss()
 
-            if result:
-                self.show_popup("Success", f"Removed {member_input.text.strip()} from team!")
-            else:
-                self.show_popup("Error", "Member not found or not removable!")
-            popup.dismiss()
-
-        remove_button.bind(on_press=remove_member_action)
-        close_button.bind(on_press=popup.dismiss)
-
-        popup.open()
+        show_form("Remove Team Member", "Enter member username to remove:", [("Enter member username", False)],
+                  remove_member_action, submit_text="Remove")
 
     def delete_team(self):
         """Deletes the team if the user is an admin."""
         if not self.current_team:
-            self.show_popup("Error", "You are not in a team!")
+            show_message("Error", "You are not in a team!")
             return
 
-        db = Database()
-        is_admin = db.is_team_admin(self.username, self.current_team)
-        db.close()
+        username, team_name = self.username, self.current_team
+        self.run_db(lambda db: db.is_team_admin(username, team_name), self.confirm_delete_team)
 
+    def confirm_delete_team(self, is_admin):
+        """Asks for confirmation before deleting the team."""
         if not is_admin:
-            self.show_popup("Error", "Only the team admin can delete the team!")
+            show_message("Error", "Only the team admin can delete the team!")
             return
 
-        def confirm_delete(instance):
-            db = Database()
-            result = db.delete_team(self.username, self.current_team)
-            db.close()
-
-            if result:
-                self.show_popup("Success", "Team deleted successfully!")
-            else:
-                self.show_popup("Error", "Failed to delete team!")
-
-            confirm_popup.dismiss()
-
-        popup_layout = BoxLayout(orientation="vertical", padding=10, spacing=10)
-        popup_layout.add_widget(Label(text="Are you sure you want to delete the team?", size_hint_y=None, height=40))
-        confirm_button = Button(text="Delete", size_hint_y=None, height=50)
-        cancel_button = Button(text="Cancel", size_hint_y=None, height=50)
-
-        popup_layout.add_widget(confirm_button)
-        popup_layout.add_widget(cancel_button)
-
-        confirm_popup = Popup(title="Delete Team", content=popup_layout, size_hint=(None, None), size=(400, 300))
-        confirm_button.bind(on_press=confirm_delete)
-        cancel_button.bind(on_press=confirm_popup.dismiss)
-        confirm_popup.open()
+        def confirm_delete():
+            username, team_name = self.username, self.current_team
 
-    def show_popup(self, title, message):
-        """Creates and displays a popup with the given title and message."""
-        popup_layout = BoxLayout(orientation="vertical", padding=10, spacing=10)
-        popup_label = Label(text=message, font_size=16, size_hint_y=None, height=100)
-        close_button = Button(text="OK", size_hint_y=None, height=50)
-        
-        popup_layout.add_widget(popup_label)
-        popup_layout.add_widget(close_button)
+            def done(result):
+                if result:
+                    show_message("Success", "Team deleted successfully!")
+                else:
+                    show_message("Error", "Failed to delete team!")
 
-        popup = Popup(title=title, content=popup_layout, size_hint=(None, None), size=(400, 300))
-        close_button.bind(on_press=popup.dismiss)
+            self.run_db(lambda db: db.delete_team(username, team_name), done, cancel_on_leave=False)
 
-        popup.open()
+        confirm("Delete Team", "Are you sure you want to delete the team?", confirm_delete, confirm_text="Delete")
@@ -0,0 +1,216 @@
+"""Data-layer tests: schema migrations, trigger-maintained aggregates and import dedupe.
+
+Only the data package and sqlite3 are used, so these run without Kivy. Every test works
+on a fresh database in a temporary directory:
+
+    python -m pytest -q tests
+"""
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from data.database import MIGRATIONS, ConnectionManager, Database
+from data import exporter, importer
+
+AGGREGATES = ("workout_totals", "workout_rollups", "team_daily_totals", "team_totals", "team_window_totals")
+
+
+class DatabaseTestCase(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.db = self.open_database("test.db")
+
+    def open_database(self, name):
+        manager = ConnectionManager(os.path.join(self.directory, name), "throughput")
+        self.addCleanup(manager.close)
+        return Database(manager.connection(), manager.events)
+
+    def add_users(self, db, *usernames):
+        with db.conn:
+            db.cursor.executemany(
+                "INSERT INTO users (username, email, password, join_date) VALUES (?, ?, ?, '2026-01-01')",
+                ((name, f"{name}@example.com", "not-a-hash") for name in usernames))
+
+    def count_workouts(self, db):
+        db.cursor.execute("SELECT COUNT(*) FROM workouts")
+        return db.cursor.fetchone()[0]
+
+
+def recent_workouts(username, count, start=0):
+    """Distinct workouts spread over the last few weeks, so every leaderboard window has data."""
+    now = datetime.now().replace(microsecond=0)
+    return [{"username": username, "workout_type": ("Running", "Cycling", "Yoga")[i % 3],
+             "duration": 10 + i % 50, "calories": 100 + i, "date": now - timedelta(hours=7 * i)}
+            for i in range(start, start + count)]
+
+
+def snapshot(db):
+    """Every aggregate table's rows, in a comparable order."""
+    return {table: sorted(db.conn.execute(f"SELECT * FROM {table}").fetchall(), key=repr) for table in AGGREGATES}
+
+
+def triggers(db):
+    return db.conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' ORDER BY name").fetchall()
+
+
+class MigrationTests(DatabaseTestCase):
+    def test_fresh_database_reaches_latest_version(self):
+        self.assertEqual(self.db.get_schema_version(), MIGRATIONS[-1][0])
+
+    def test_reopening_applies_nothing(self):
+        self.db.cursor.execute("SELECT version, applied_at FROM schema_version")
+        applied = self.db.cursor.fetchall()
+        reopened = self.open_database("test.db")
+        reopened.cursor.execute("SELECT version, applied_at FROM schema_version")
+        self.assertEqual(reopened.cursor.fetchall(), applied)
+
+    def test_backfill_gives_legacy_workouts_the_importer_key(self):
+        # Rows as app versions before migration 11 stored them: no dedupe key, duplicates allowed.
+        legacy = [("alice", "Running", 30, 250, "2026-01-01 10:00:00")] * 2 + \
+                 [("alice", "Yoga", 45, 150, "2026-01-02 10:00:00")]
+        with self.db.conn:
+            self.db.cursor.executemany(
+                "INSERT INTO workouts (username, workout_type, duration, calories, date) VALUES (?, ?, ?, ?, ?)",
+                legacy)
+            self.db.cursor.execute("DELETE FROM schema_version WHERE version = 11")
+
+        reopened = self.open_database("test.db")
+        self.assertEqual(reopened.get_schema_version(), MIGRATIONS[-1][0])
+        reopened.cursor.execute("SELECT username, workout_type, duration, calories, date, dedupe_key "
+                                "FROM workouts ORDER BY id")
+        rows = reopened.cursor.fetchall()
+        expected = [importer.dedupe_key(row[0], {"workout_type": row[1], "duration": row[2], "calories": row[3],
+                                                 "date": row[4]}) for row in legacy]
+        # The second identical row cannot share the unique key and keeps NULL.
+        self.assertEqual([row[5] for row in rows], [expected[0], None, expected[2]])
+
+
+class AggregateTests(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_users(self.db, "alice", "bob", "carol")
+        self.db.add_team("red", "alice")
+        self.db.add_team("blue", "bob")
+
+    def assert_matches_rebuild(self, db):
+        maintained = snapshot(db)
+        db.rebuild_workout_totals()
+        db.rebuild_workout_rollups()
+        db.rebuild_team_leaderboards()
+        self.assertEqual(maintained, snapshot(db))
+
+    def test_triggers_match_rebuild(self):
+        self.db.add_workouts_bulk(None, recent_workouts("alice", 40) + recent_workouts("carol", 30))
+        self.db.add_workout("bob", "Running", 30, 250)
+        self.db.add_workout("bob", "Running", 30, 250)
+        self.db.join_team("red", "carol")  # Brings carol's earlier workouts into red's totals
+        with self.db.conn:
+            self.db.cursor.execute("UPDATE workouts SET duration = duration + 5, calories = calories * 2 "
+                                   "WHERE username = 'alice' AND workout_type = 'Yoga'")
+        self.assert_matches_rebuild(self.db)
+
+    def test_totals_stay_consistent_after_reset(self):
+        self.db.add_workouts_bulk(None, recent_workouts("alice", 20) + recent_workouts("bob", 20))
+        self.db.reset_workout_summary("alice")
+        self.assertEqual(self.db.verify_workout_totals(), [])
+        self.assertEqual(self.db.get_workout_summary("alice")["total_workouts"], 0)
+
+    def test_bulk_load_matches_per_row_triggers(self):
+        other = self.open_database("other.db")
+        self.add_users(other, "alice", "bob", "carol")
+        other.add_team("red", "alice")
+        other.add_team("blue", "bob")
+        other.join_team("red", "carol")
+        self.db.join_team("red", "carol")
+        existing = recent_workouts("alice", 10)
+        self.db.add_workouts_bulk(None, existing)
+        other.add_workouts_bulk(None, existing)
+        installed = triggers(self.db)
+
+        loaded = recent_workouts("alice", 30, start=10) + recent_workouts("bob", 25) + recent_workouts("carol", 25)
+        with self.db.bulk_load():
+            self.db.add_workouts_bulk(None, loaded[:40])
+            self.db.add_workouts_bulk(None, loaded[40:])
+        other.add_workouts_bulk(None, loaded)
+
+        self.assertEqual(snapshot(self.db), snapshot(other))
+        self.assertEqual(triggers(self.db), installed)
+        self.assert_matches_rebuild(self.db)
+
+    def test_failed_bulk_load_leaves_nothing(self):
+        installed = triggers(self.db)
+        with self.assertRaises(RuntimeError):
+            with self.db.bulk_load():
+                self.db.add_workouts_bulk(None, recent_workouts("alice", 10))
+                raise RuntimeError("interrupted")
+        self.assertEqual(self.count_workouts(self.db), 0)
+        self.assertEqual(triggers(self.db), installed)
+        self.db.add_workout("alice", "Running", 30, 250)  # The triggers still maintain the totals
+        self.assertEqual(self.db.get_workout_summary("alice")["total_workouts"], 1)
+
+
+class ImportTests(DatabaseTestCase):
+    def write_csv(self, name, lines):
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write("username,workout_type,duration,calories,date\n")
+            handle.writelines(line + "\n" for line in lines)
+        return path
+
+    def test_reimporting_a_file_adds_nothing(self):
+        path = self.write_csv("workouts.csv", [
+            "alice,Running,30,250,2026-01-01 10:00:00",
+            "alice,Running,30,250,2026-01-01 10:00:00",  # Repeated within the file
+            "bob,Yoga,45,150,2026-01-02T08:30:00",
+            "bob,Yoga,not-a-number,150,2026-01-02 08:30:00",
+        ])
+        first = importer.import_workouts(self.db, path, chunk_size=2)
+        self.assertEqual(first, {"read": 4, "inserted": 2, "duplicates": 1, "rejected": 1})
+        second = importer.import_workouts(self.db, path)
+        self.assertEqual(second, {"read": 4, "inserted": 0, "duplicates": 3, "rejected": 1})
+        self.assertEqual(self.db.verify_workout_totals(), [])
+
+    def test_identical_workouts_logged_in_the_app_are_both_kept(self):
+        self.db.add_workout("alice", "Running", 30, 250)
+        self.db.add_workout("alice", "Running", 30, 250)
+        self.assertEqual(self.count_workouts(self.db), 2)
+
+    def test_export_then_import_into_the_same_database_adds_nothing(self):
+        self.db.add_workout("alice", "Running", 30, 250)
+        self.db.add_workout("alice", "Running", 30, 250)
+        self.db.add_workouts_bulk("bob", [{"workout_type": "Yoga", "duration": 45, "calories": 150}])
+        self.db.add_workouts_bulk(None, recent_workouts("carol", 5))
+        with self.db.conn:  # Identical legacy rows: migration 11 keys the first and leaves the second NULL
+            self.db.cursor.executemany("INSERT INTO workouts (username, workout_type, duration, calories, date) "
+                                       "VALUES ('dave', 'Rowing', 20, 180, '2025-12-31 07:00:00')", [(), ()])
+            self.db.cursor.execute("DELETE FROM schema_version WHERE version = 11")
+        self.db = self.open_database("test.db")
+        stored = self.count_workouts(self.db)
+
+        for fmt in importer.FORMATS:
+            with self.subTest(fmt=fmt):
+                path = os.path.join(self.directory, f"export.{fmt}.gz")
+                self.assertEqual(exporter.export_workouts(self.db, path), stored)
+                stats = importer.import_workouts(self.db, path)
+                self.assertEqual(stats["inserted"], 0)
+                self.assertEqual(stats["duplicates"], stored)
+                self.assertEqual(self.count_workouts(self.db), stored)
+
+    def test_export_imports_completely_into_a_new_database(self):
+        self.db.add_workout("alice", "Running", 30, 250)
+        self.db.add_workout("alice", "Running", 30, 250)
+        self.db.add_workouts_bulk(None, recent_workouts("bob", 5))
+        path = os.path.join(self.directory, "export.jsonl")
+        exporter.export_workouts(self.db, path)
+
+        other = self.open_database("other.db")
+        self.assertEqual(importer.import_workouts(other, path)["inserted"], 7)
+        self.assertEqual(other.get_workout_summary("alice")["total_workouts"], 2)
+        self.assertEqual(other.verify_workout_totals(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+"""Drift-free workout timer: time is read from clock timestamps instead of counted in ticks.
+
+The UI only needs to wake up when the displayed second changes (next_change_in()), and
+a late or skipped frame can never lose time. The default clock is CLOCK_BOOTTIME where
+available (Linux/Android), which keeps running while the device sleeps with the app in
+the background; elsewhere it is time.monotonic().
+"""
+import math
+import time
+
+STOPWATCH = "Stopwatch"
+COUNTDOWN = "Countdown"
+
+
+def default_clock():
+    """A monotonic clock that, where possible, also counts time spent suspended."""
+    boottime = getattr(time, "CLOCK_BOOTTIME", None)
+    if boottime is not None:
+        try:
+            time.clock_gettime(boottime)
+            return lambda: time.clock_gettime(boottime)
+        except OSError:
+            pass
+    return time.monotonic
+
+
+def format_seconds(seconds):
+    """MM:SS, or H:MM:SS from an hour up."""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02}:{seconds:02}" if hours else f"{minutes:02}:{seconds:02}"
+
+
+class TimerEngine:
+    """Stopwatch or countdown with laps and optional repeating intervals.
+
+    `duration` is the countdown length in seconds; `intervals` is a sequence of
+    (label, seconds) phases that repeat for as long as the timer runs, e.g.
+    (("Work", 40), ("Rest", 20)).
+    """
+
+    def __init__(self, mode=STOPWATCH, duration=0, intervals=(), clock=None):
+        self.clock = clock or default_clock()
+        self.mode = mode
+        self.duration = duration
+        self.intervals = tuple(intervals)
+        self.laps = []  # (elapsed at lap, lap length) in seconds
+        self._accumulated = 0.0  # Seconds run before the current start()
+        self._started_at = None
+
+    @property
+    def running(self):
+        return self._started_at is not None
+
+    @property
+    def finished(self):
+        return self.mode == COUNTDOWN and self.elapsed() >= self.duration
+
+    def configure(self, mode=STOPWATCH, duration=0, intervals=()):
+        """Changes mode, countdown length or intervals; resets the timer."""
+        self.mode, self.duration, self.intervals = mode, duration, tuple(intervals)
+        self.reset()
+
+    def start(self):
+        if not self.running and not self.finished:
+            self._started_at = self.clock()
+
+    def pause(self):
+        if self.running:
+            self._accumulated += self.clock() - self._started_at
+            self._started_at = None
+
+    def reset(self):
+        self._accumulated = 0.0
+        self._started_at = None
+        self.laps = []
+
+    def elapsed(self):
+        """Seconds the timer has run (capped at the countdown length)."""
+        elapsed = self._accumulated
+        if self.running:
+            elapsed += self.clock() - self._started_at
+        return min(elapsed, self.duration) if self.mode == COUNTDOWN else elapsed
+
+    def remaining(self):
+        """Seconds left on a countdown, or None for a stopwatch."""
+        return max(self.duration - self.elapsed(), 0.0) if self.mode == COUNTDOWN else None
+
+    def lap(self):
+        """Records a lap and returns (elapsed, lap length)."""
+        elapsed = self.elapsed()
+        lap = (elapsed, elapsed - (self.laps[-1][0] if self.laps else 0.0))
+        self.laps.append(lap)
+        return lap
+
+    def current_interval(self):
+        """(round, label, seconds left in the phase) for interval training, or None."""
+        cycle = sum(seconds for _, seconds in self.intervals)
+        if not cycle:
+            return None
+        elapsed = self.elapsed()
+        position = elapsed % cycle
+        for label, seconds in self.intervals:
+            if position < seconds:
+                return int(elapsed // cycle) + 1, label, seconds - position
+            position -= seconds
+        return int(elapsed // cycle) + 1, self.intervals[-1][0], 0.0
+
+    def display_seconds(self):
+        """Whole seconds to show: elapsed rounded down, or a countdown's remaining time rounded up."""
+        if self.mode == COUNTDOWN:
+            return math.ceil(self.remaining())
+        return math.floor(self.elapsed())
+
+    def display(self):
+        return format_seconds(self.display_seconds())
+
+    def next_change_in(self):
+        """Seconds until display_seconds() next changes (1.0 while stopped)."""
+        if not self.running:
+            return 1.0
+        fraction = (self.remaining() if self.mode == COUNTDOWN else self.elapsed()) % 1.0
+        if self.mode == COUNTDOWN:
+            return fraction or 1.0
+        return 1.0 - fraction
@@ -1,28 +1,45 @@
 from kivy.uix.screenmanager import Screen
-from kivy.uix.popup import Popup
-from kivy.uix.label import Label
-from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.button import Button
-from kivy.uix.textinput import TextInput
 from kivy.uix.filechooser import FileChooserIconView
-from database import Database
 from kivy.app import App
+from data.events import MeasurementsUpdated
+from db_worker import AsyncDatabaseMixin
+from dialogs import show_form, show_message
 
-class ProfileScreen(Screen):
+class ProfileScreen(AsyncDatabaseMixin, Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.username = "test_user"  # Replace with actual logged-in user
+        self.subscribe(MeasurementsUpdated, self.on_measurements_updated)
 
     def on_enter(self):
         """Load user data when entering the screen."""
-        app = App.get_running_app()
-        self.username = app.logged_in_user
+        session = App.get_running_app().current_session()
+        if not session:
+            self.manager.current = "auth"  # Session expired or logged out
+            return
+        self.username = session.username
         self.load_profile()
 
     def load_profile(self):
-        """Fetch user details and update UI."""
-        db = Database()
-        user = db.get_user_info(self.username)
+        """Shows the session's cached profile, fetching it in the background if needed."""
+        session = App.get_running_app().current_session()
+        if session and session.has("profile"):
+            self.show_profile(session.get("profile"))
+            return
+
+        username = self.username
+        version = session.version("profile") if session else None
+
+        def done(user):
+            if session and user is not None:
+                session.set("profile", user, version)
+            self.show_profile(user)
+
+        self.ids.username_label.text = "Username: Loading..."
+        self.run_db(lambda db: db.get_user_info(username), done)
+
+    def show_profile(self, user):
+        """Fills the profile labels with the fetched user details."""
         if user is None:
             print("⚠️ User not found! Cannot load profile.")
             return
@@ -36,50 +53,26 @@ class ProfileScreen(Screen):
             self.ids.body_fat_label.text = f"Body Fat: {user['body_fat']}%"
             self.ids.bmi_label.text = f"BMI: {user['bmi']}"
         else:
-            self.show_popup("Error", "User not found!")
-
-    def update_measurements_popup(self):
-        """Popup to update weight, height, and body fat percentage."""
-        popup_layout = BoxLayout(orientation="vertical", padding=10, spacing=10)
-
-        weight_input = TextInput(hint_text="Enter weight (kg)", size_hint_y=None, height=40)
-        height_input = TextInput(hint_text="Enter height (cm)", size_hint_y=None, height=40)
-        body_fat_input = TextInput(hint_text="Enter body fat %", size_hint_y=None, height=40)
+            show_message("Error", "User not found!")
 
-        update_button = Button(text="Update", size_hint_y=None, height=50)
-        close_button = Button(text="Cancel", size_hint_y=None, height=50)
-
-        popup_layout.add_widget(Label(text="Update Body Measurements:", size_hint_y=None, height=30))
-        popup_layout.add_widget(weight_input)
-        popup_layout.add_widget(height_input)
-        popup_layout.add_widget(body_fat_input)
-        popup_layout.add_widget(update_button)
-        popup_layout.add_widget(close_button)
-
-        popup = Popup(title="Update Measurements", content=popup_layout, size_hint=(None, None), size=(400, 350))
-
-        def update_action(instance):
-            db = Database()
-            db.update_measurements(self.username, float(weight_input.text), float(height_input.text), float(body_fat_input.text))
-            db.close()
+    def on_measurements_updated(self, event):
+        """Shows new measurements; the session has already patched its cached profile."""
+        if event.username == self.username:
             self.load_profile()
-            popup.dismiss()
-
-        update_button.bind(on_press=update_action)
-        close_button.bind(on_press=popup.dismiss)
-
-        popup.open()
 
-    def show_popup(self, title, message):
-        """Creates and displays a popup with the given title and message."""
-        popup_layout = BoxLayout(orientation="vertical", padding=10, spacing=10)
-        popup_label = Label(text=message, font_size=16, size_hint_y=None, height=100)
-        close_button = Button(text="OK", size_hint_y=None, height=50)
-
-        popup_layout.add_widget(popup_label)
-        popup_layout.add_widget(close_button)
-
-        popup = Popup(title=title, content=popup_layout, size_hint=(None, None), size=(400, 300))
-        close_button.bind(on_press=popup.dismiss)
-
-        popup.open()
+    def update_measurements_popup(self):
+        """Popup to update weight, height, and body fat percentage."""
+        def update_action(values, dialog):
+            try:
+                weight, height, body_fat = (float(value) for value in values)
+            except ValueError:
+                dialog.set_status("Enter numbers only.")
+                return
+            username = self.username
+            self.run_db(lambda db: db.update_measurements(username, weight, height, body_fat),
+                        cancel_on_leave=False)  # The labels update through on_measurements_updated
+            dialog.dismiss()
+
+        show_form("Update Measurements", "Update Body Measurements:",
+                  [("Enter weight (kg)", False), ("Enter height (cm)", False), ("Enter body fat %", False)],
+                  update_action, submit_text="Update", size=(400, 350))
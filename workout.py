@@ -1,50 +1,114 @@
+import math
 from kivy.uix.screenmanager import Screen
 from kivy.clock import Clock
 from kivy.app import App
-from database import Database
-
-class WorkoutScreen(Screen):
+from data.events import WorkoutAdded, WorkoutsImported, WorkoutsReset
+from db_worker import AsyncDatabaseMixin
+from timer_engine import COUNTDOWN, TimerEngine, format_seconds
+
+HISTORY_PAGE_SIZE = 30
+DEFAULT_COUNTDOWN_MINUTES = 20
+TICK_SLACK = 0.01  # Wake just after the displayed second changes, not just before
+# Interval training presets: (label, seconds) phases that repeat while the timer runs.
+INTERVAL_PRESETS = {
+    "No intervals": (),
+    "Work 40s / Rest 20s": (("Work", 40), ("Rest", 20)),
+    "Work 30s / Rest 30s": (("Work", 30), ("Rest", 30)),
+    "Tabata 20s / 10s": (("Work", 20), ("Rest", 10)),
+}
+
+
+class WorkoutScreen(AsyncDatabaseMixin, Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.timer_running = False
-        self.timer_seconds = 0
+        self.timer = TimerEngine()
+        self.tick_event = None
+        self.history_cursor = None  # (date, id) of the oldest row shown
+        self.history_exhausted = False
+        self.history_job = None
+        self.history_user = None  # Whose history the list shows; kept current by database events
+        self.history_ids = set()
+        self.subscribe(WorkoutAdded, self.on_workout_added)
+        self.subscribe(WorkoutsReset, self.on_workouts_reset)
+        self.subscribe(WorkoutsImported, self.on_workouts_imported)
 
     def on_enter(self):
-        """Fetch the logged-in username when entering the screen."""
-        app = App.get_running_app()
-        self.username = getattr(app, 'logged_in_user', None)
-
-        if not self.username:
-            print("No logged-in user found!")
-            self.ids.workout_log.text = "[b]Error: No logged-in user![/b]"
-            return  # Prevent errors if no user is logged in
-
-        self.load_workout_history()
+        """Takes the username from the app session when entering the screen."""
+        session = App.get_running_app().current_session()
+        if not session:
+            self.manager.current = "auth"  # Session expired or logged out
+            return
+        self.username = session.username
+
+        if not self.timer.running and not self.timer.elapsed():
+            self.configure_timer()  # Pick up a timer mode changed in Settings
+        self.refresh_timer()
+
+        # Database events keep the list current while it is hidden; reload only for another
+        # user or if leaving the screen cancelled a page that was still loading.
+        if self.username != self.history_user or (self.history_job and self.history_job.cancelled):
+            self.load_workout_history()
+
+    def on_leave(self, *args):
+        """Stops display updates while hidden; the timer itself keeps running."""
+        self.cancel_tick()
+        super().on_leave(*args)
+
+    def configure_timer(self):
+        """Sets the timer up for the app's timer mode (Stopwatch or Countdown)."""
+        mode = App.get_running_app().timer_mode
+        minutes = self.ids.countdown_spinner.text.split()[0]
+        minutes = int(minutes) if minutes.isdigit() else DEFAULT_COUNTDOWN_MINUTES
+        intervals = INTERVAL_PRESETS.get(self.ids.interval_spinner.text, ())
+        self.timer.configure(mode, duration=minutes * 60, intervals=intervals)
+        self.ids.countdown_spinner.disabled = mode != COUNTDOWN
 
     def start_timer(self):
-        """Starts the workout timer."""
-        if not self.timer_running:
-            self.timer_running = True
-            Clock.schedule_interval(self.update_timer, 1)
+        """Starts (or resumes) the workout timer."""
+        if self.timer.finished or (not self.timer.running and not self.timer.elapsed()):
+            self.configure_timer()  # Fresh start: apply the current mode and countdown length
+        self.timer.start()
+        self.refresh_timer()
 
     def stop_timer(self):
-        """Stops the workout timer."""
-        if self.timer_running:
-            self.timer_running = False
-            Clock.unschedule(self.update_timer)
+        """Pauses the workout timer."""
+        self.timer.pause()
+        self.refresh_timer()
 
     def reset_timer(self):
         """Resets the timer to zero."""
-        self.stop_timer()
-        self.timer_seconds = 0
-        self.ids.timer_label.text = "00:00"
+        self.configure_timer()
+        self.ids.lap_label.text = ""
+        self.refresh_timer()
 
-    def update_timer(self, dt):
-        """Updates the timer display every second."""
-        self.timer_seconds += 1
-        minutes = self.timer_seconds // 60
-        seconds = self.timer_seconds % 60
-        self.ids.timer_label.text = f"{minutes:02}:{seconds:02}"
+    def lap_timer(self):
+        """Records a lap and shows it under the timer."""
+        if not self.timer.running:
+            return
+        number = len(self.timer.laps) + 1
+        elapsed, length = self.timer.lap()
+        self.ids.lap_label.text = f"Lap {number}: {format_seconds(length)} (total {format_seconds(elapsed)})"
+
+    def refresh_timer(self, dt=None):
+        """Redraws the timer and schedules the next redraw for when the shown second changes."""
+        self.cancel_tick()
+        self.ids.timer_label.text = self.timer.display()
+        interval = self.timer.current_interval()
+        if interval:
+            number, label, left = interval
+            self.ids.interval_label.text = f"{label} - round {number} - {math.ceil(left)}s left"
+        else:
+            self.ids.interval_label.text = ""
+        if self.timer.finished and self.timer.running:
+            self.timer.pause()
+            self.ids.lap_label.text = "[b]Time's up![/b]"
+        if self.timer.running and self.manager and self.manager.current == self.name:
+            self.tick_event = Clock.schedule_once(self.refresh_timer, self.timer.next_change_in() + TICK_SLACK)
+
+    def cancel_tick(self):
+        if self.tick_event is not None:
+            self.tick_event.cancel()
+            self.tick_event = None
 
     def log_workout(self):
         """Logs the completed workout to the database."""
@@ -54,38 +118,105 @@ class WorkoutScreen(Screen):
 
         workout_type = self.ids.workout_type_spinner.text
         calories_burned = int(self.ids.calories_slider.value)
-        duration = self.timer_seconds // 60  # Convert seconds to minutes
+        duration = round(self.timer.elapsed() / 60)  # Convert seconds to minutes
 
         if workout_type == "Select Workout":
             self.ids.workout_log.text = "[b]Please select a workout type![/b]"
             return
 
-        db = Database()
-        db.add_workout(self.username, workout_type, duration, calories_burned)
-        db.close()
+        username = self.username
+        self.ids.workout_log.text = "[b]Logging workout...[/b]"
+        self.run_db(lambda db: db.add_workout(username, workout_type, duration, calories_burned),
+                    self.on_workout_logged, self.on_workout_log_failed, cancel_on_leave=False)
 
+    def on_workout_logged(self, result):
+        """Confirms the logged workout; the history list gets it through on_workout_added."""
         self.ids.workout_log.text = "[b]Workout Logged Successfully![/b]"
-        self.load_workout_history()  # Refresh workout history
+
+    def on_workout_log_failed(self, error):
+        """Reports a workout that could not be saved."""
+        self.ids.workout_log.text = "[b]Error: Could not log workout![/b]"
 
     def load_workout_history(self):
-        """Loads the workout history from the database and updates the UI."""
+        """Resets the history list and loads its first page."""
+        if self.history_job:
+            self.history_job.cancel()
+        self.history_job = None
+        self.history_cursor = None
+        self.history_exhausted = False
+        self.history_user = getattr(self, 'username', None)
+        self.history_ids = set()
+        self.ids.history_list.data = []
+
         if not hasattr(self, 'username') or not self.username:
             self.ids.workout_history.text = "[b]Error: No logged-in user![/b]"
             return
 
-        db = Database()
-        history = db.get_workout_history(self.username)
-        db.close()
-
-        if history:
-            history_text = "\n".join([
-                f"{entry['workout_type']} - {entry['duration']} mins, {entry['calories']} kcal ({entry['date']})"
-                for entry in history
-            ])
-            self.ids.workout_history.text = f"[b]Workout History:[/b]\n{history_text}"
+        self.ids.workout_history.text = "[b]Loading workout history...[/b]"
+        self.load_more_history()
+
+    def load_more_history(self):
+        """Fetches the next page of older workouts in the background."""
+        job = self.history_job
+        if self.history_exhausted or (job and not job.done and not job.cancelled):
+            return  # Nothing older, or a page is already on its way
+
+        username, before = self.username, self.history_cursor
+        self.history_job = self.run_db(
+            lambda db: db.get_workout_history_page(username, before, HISTORY_PAGE_SIZE),
+            self.show_workout_history)
+
+    def show_workout_history(self, page):
+        """Appends a fetched page of workouts to the history list."""
+        history, self.history_cursor = page
+        self.history_exhausted = self.history_cursor is None
+
+        # Skip rows already added by on_workout_added while this page was being fetched.
+        new = [entry for entry in history if entry["id"] not in self.history_ids]
+        self.history_ids.update(entry["id"] for entry in new)
+        self.ids.history_list.data.extend(self.history_row(entry) for entry in new)
+        self.show_history_heading()
+
+    def history_row(self, entry):
+        return {"text": f"{entry['workout_type']} - {entry['duration']} mins, {entry['calories']} kcal ({entry['date']})"}
+
+    def show_history_heading(self):
+        if self.ids.history_list.data:
+            self.ids.workout_history.text = "[b]Workout History:[/b]"
         else:
             self.ids.workout_history.text = "[b]No past workouts found.[/b]"
 
+    def on_workout_added(self, event):
+        """Puts a newly logged workout at the top of the history list."""
+        if event.username != self.history_user or event.workout["id"] in self.history_ids:
+            return
+        self.history_ids.add(event.workout["id"])
+        self.ids.history_list.data.insert(0, self.history_row(event.workout))
+        self.show_history_heading()
+
+    def on_workouts_reset(self, event):
+        """Empties the history list when the user's workouts are deleted."""
+        if event.username != self.history_user:
+            return
+        if self.history_job:
+            self.history_job.cancel()
+        self.history_job = None
+        self.history_cursor = None
+        self.history_exhausted = True
+        self.history_ids = set()
+        self.ids.history_list.data = []
+        self.show_history_heading()
+
+    def on_workouts_imported(self, event):
+        """Reloads the history after a bulk import; the event carries only a count."""
+        if self.history_user and event.username in (None, self.history_user):
+            self.load_workout_history()
+
+    def on_history_scroll(self, scroll_y):
+        """Loads older workouts once the list is scrolled near its bottom."""
+        if scroll_y <= 0.1:
+            self.load_more_history()
+
     def go_back(self):
         """Navigates back to the home screen."""
         self.manager.current = "home"